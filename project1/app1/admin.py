@@ -1,7 +1,169 @@
-from django.contrib import admin
-from app1.models import Employee,Department,Question
-admin.site.register(Employee)
-admin.site.register(Department)
-admin.site.register(Question)
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
 
+from app1 import archive, checklists
+from app1.models import Employee, Department, Question, EmployeeQuestionResponse, DepartmentEmployeeComment
 
+
+class CappedCountPaginator(Paginator):
+    """Counts at most ``cap`` rows, so changelists of huge tables don't COUNT(*) them all."""
+    cap = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.cap].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = CappedCountPaginator
+    show_full_result_count = False  # skips the unfiltered COUNT(*) next to the filtered one
+    list_per_page = 50
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    per_page = 25
+    page = 1
+
+    def get_queryset(self):
+        if not hasattr(self, "_page_queryset"):
+            start = (self.page - 1) * self.per_page
+            self._page_queryset = super().get_queryset()[start:start + self.per_page]
+        return self._page_queryset
+
+
+class ReadOnlyPaginatedInline(admin.TabularInline):
+    """Read-only inline showing one page of rows; ``?<prefix>_page=N`` selects the page."""
+    formset = PaginatedInlineFormSet
+    extra = 0
+    can_delete = False
+    show_change_link = True
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        prefix = formset.get_default_prefix()
+        try:
+            page = max(int(request.GET.get(f"{prefix}_page", 1)), 1)
+        except ValueError:
+            page = 1
+        total = self.get_queryset(request).filter(**{self.fk_name or "employee": obj}).count() if obj else 0
+        pages = max((total + self.per_page - 1) // self.per_page, 1)
+        formset.page = min(page, pages)
+        formset.per_page = self.per_page
+        self.verbose_name_plural = (
+            f"{self.model._meta.verbose_name_plural} ({total}; page {formset.page} of {pages}, ?{prefix}_page=N)"
+        )
+        return formset
+
+
+class ResponseInline(ReadOnlyPaginatedInline):
+    model = EmployeeQuestionResponse
+    fk_name = "employee"
+    per_page = 25
+    fields = ("department", "question", "is_checked", "checked_at")
+    readonly_fields = fields
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("department", "question__department").order_by("department_id", "question_id")
+
+
+class CommentInline(ReadOnlyPaginatedInline):
+    model = DepartmentEmployeeComment
+    fk_name = "employee"
+    per_page = 25
+    fields = ("department", "comment_text", "department_head_id", "updated_at")
+    readonly_fields = fields
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("department").order_by("department_id")
+
+
+@admin.register(Employee)
+class EmployeeAdmin(LargeTableAdmin):
+    list_display = ("employee_id", "employee_name", "employee_department", "status", "type_of_separation", "last_work_date")
+    list_filter = ("status", "type_of_separation", "last_work_date")
+    # Exact match on the indexed id; the name is a prefix match.
+    search_fields = ("=employee_id", "^employee_name")
+    autocomplete_fields = ("assigned_departments",)
+    readonly_fields = ("status", "progress", "version", "created_at")
+    inlines = (CommentInline, ResponseInline)
+    actions = ("recompute_status", "archive_done")
+    ordering = ("-id",)
+
+    def save_related(self, request, form, formsets, change):
+        before = set(form.instance.assigned_departments.values_list("id", flat=True)) if change else set()
+        super().save_related(request, form, formsets, change)
+        # The same fan-out the API does for newly assigned departments.
+        for dept in form.instance.assigned_departments.exclude(id__in=before):
+            checklists.provision(dept, [form.instance.pk])
+        form.instance.update_status()
+
+    @admin.action(description="Recompute status of selected employees")
+    def recompute_status(self, request, queryset):
+        ids = list(queryset.values_list("id", flat=True))
+        for start in range(0, len(ids), 1000):
+            Employee.recompute_statuses(ids[start:start + 1000])
+        self.message_user(request, f"Recomputed the status of {len(ids)} employees.")
+
+    @admin.action(description="Archive selected completed clearances")
+    def archive_done(self, request, queryset):
+        selected = queryset.count()
+        archived = archive.archive_employees(queryset.filter(status="done"))
+        level = messages.SUCCESS if archived == selected else messages.WARNING
+        self.message_user(request, f"Archived {archived} of {selected} selected employees; only completed clearances are archived.", level)
+
+
+@admin.register(Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ("name", "email", "is_assigned_department", "created_at")
+    list_filter = ("is_assigned_department",)
+    search_fields = ("name", "email")
+    exclude = ("password",)  # set by the department itself through the API
+    readonly_fields = ("user",)
+
+
+@admin.register(Question)
+class QuestionAdmin(LargeTableAdmin):
+    list_display = ("text", "department", "is_concerned_question")
+    list_select_related = ("department",)
+    list_filter = ("department", "is_concerned_question")
+    search_fields = ("text",)
+    autocomplete_fields = ("department",)
+
+
+@admin.register(EmployeeQuestionResponse)
+class EmployeeQuestionResponseAdmin(LargeTableAdmin):
+    list_display = ("employee", "department", "question_text", "is_checked", "checked_at")
+    list_select_related = ("employee", "department", "question")
+    list_filter = ("department", "is_checked")
+    search_fields = ("=employee__employee_id",)
+    raw_id_fields = ("employee", "question")
+    autocomplete_fields = ("department",)
+    readonly_fields = ("version", "created_at", "checked_at")
+    ordering = ("-id",)
+
+    @admin.display(description="Question")
+    def question_text(self, obj):
+        return obj.question.text[:80]
+
+
+@admin.register(DepartmentEmployeeComment)
+class DepartmentEmployeeCommentAdmin(LargeTableAdmin):
+    list_display = ("employee", "department", "comment_text", "department_head_id", "updated_at")
+    list_select_related = ("employee", "department")
+    list_filter = ("department",)
+    search_fields = ("=employee__employee_id",)
+    raw_id_fields = ("employee",)
+    autocomplete_fields = ("department",)
+    readonly_fields = ("version", "created_at", "updated_at")
+    ordering = ("-id",)
@@ -0,0 +1,213 @@
+"""
+Time-to-clear analytics.
+
+Each department's part of a clearance is tracked as a DepartmentClearance
+row (first checklist item created to last one checked). When one completes,
+or stops being complete, its duration is added to or removed from the
+ClearanceRollup histogram for that department, completion day and separation
+type. Reports merge the histograms and never touch the checklist tables.
+``rebuild_clearance_rollups`` recomputes everything from scratch nightly, to
+pick up writes that bypass the ORM's save().
+"""
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import deferred
+from .models import ClearanceRollup, DepartmentClearance, Employee, EmployeeQuestionResponse
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended.
+BUCKET_BOUNDS_HOURS = (1, 2, 4, 8, 12, 24, 36, 48, 72, 96, 120, 168, 240, 336, 504, 720, 1080, 1440, 2160)
+
+
+def bucket_for(seconds):
+    return bisect_right(BUCKET_BOUNDS_HOURS, seconds / 3600)
+
+
+def track(pairs):
+    """Recompute the clearances of ``(employee_id, department_id)`` pairs after their checklists changed."""
+    if not deferred.add("clearances", pairs):
+        refresh_clearances(pairs)
+
+
+def _states(pairs):
+    employee_ids = {employee_id for employee_id, _ in pairs}
+    groups = (
+        EmployeeQuestionResponse.objects.filter(employee_id__in=employee_ids)
+        .values("employee_id", "department_id", "employee__type_of_separation")
+        .annotate(
+            started=Min("created_at"),
+            last_checked=Max("checked_at"),
+            unchecked=Count("id", filter=Q(is_checked=False)),
+        )
+        .order_by()
+    )
+    return {
+        (row["employee_id"], row["department_id"]): (
+            row["employee__type_of_separation"],
+            row["started"],
+            row["last_checked"] if not row["unchecked"] else None,
+        )
+        for row in groups
+        if (row["employee_id"], row["department_id"]) in pairs
+    }
+
+
+def refresh_clearances(pairs):
+    pairs = set(pairs)
+    with transaction.atomic():
+        states = _states(pairs)
+        # A pair with no checklist left was unassigned or its employee is being
+        # deleted; its clearance stays as history.
+        existing = {
+            (c.employee_id, c.department_id): c
+            for c in DepartmentClearance.objects.select_for_update().filter(
+                employee_id__in={employee_id for employee_id, _ in states},
+                department_id__in={department_id for _, department_id in states},
+            )
+        }
+        for (employee_id, department_id), (separation, started, completed) in states.items():
+            clearance = existing.get((employee_id, department_id))
+            if clearance is None:
+                clearance = DepartmentClearance(employee_id=employee_id, department_id=department_id)
+            elif (clearance.type_of_separation, clearance.started_at, clearance.completed_at) == (separation, started, completed):
+                continue
+            else:
+                _count(clearance, -1)
+            clearance.type_of_separation, clearance.started_at, clearance.completed_at = separation, started, completed
+            clearance.save()
+            _count(clearance, 1)
+
+
+deferred.register("clearances", refresh_clearances)
+
+
+def _duration(clearance):
+    return max((clearance.completed_at - clearance.started_at).total_seconds(), 0)
+
+
+def _count(clearance, sign):
+    if clearance.completed_at is None or clearance.started_at is None:
+        return
+    seconds = _duration(clearance)
+    key = dict(
+        department_id=clearance.department_id,
+        day=timezone.localdate(clearance.completed_at),
+        type_of_separation=clearance.type_of_separation,
+        bucket=bucket_for(seconds),
+    )
+    if sign > 0:
+        ClearanceRollup.objects.bulk_create([ClearanceRollup(**key)], ignore_conflicts=True)
+    ClearanceRollup.objects.filter(**key).update(
+        count=F("count") + sign, total_seconds=F("total_seconds") + sign * seconds
+    )
+
+
+def rebuild():
+    """Recompute every live clearance and all rollups. Returns (clearances, rollup rows)."""
+    with transaction.atomic():
+        pairs = set(
+            Employee.assigned_departments.through.objects.values_list("employee_id", "department_id")
+        )
+        states = _states(pairs)
+        # As in refresh_clearances, a pair with no checklist or assignment left
+        # keeps its clearance as history; only the live pairs are recomputed.
+        existing = {(c.employee_id, c.department_id): c for c in DepartmentClearance.objects.filter(employee__isnull=False)}
+
+        changed, created = [], []
+        for key, (separation, started, completed) in states.items():
+            clearance = existing.get(key)
+            if clearance is None:
+                created.append(DepartmentClearance(
+                    employee_id=key[0], department_id=key[1],
+                    type_of_separation=separation, started_at=started, completed_at=completed,
+                ))
+            elif (clearance.type_of_separation, clearance.started_at, clearance.completed_at) != (separation, started, completed):
+                clearance.type_of_separation, clearance.started_at, clearance.completed_at = separation, started, completed
+                changed.append(clearance)
+        DepartmentClearance.objects.bulk_create(created, batch_size=500)
+        DepartmentClearance.objects.bulk_update(
+            changed, ["type_of_separation", "started_at", "completed_at"], batch_size=500
+        )
+
+        totals = defaultdict(lambda: [0, 0.0])
+        completed = DepartmentClearance.objects.filter(completed_at__isnull=False, started_at__isnull=False)
+        for clearance in completed.iterator(chunk_size=2000):
+            seconds = _duration(clearance)
+            key = (
+                clearance.department_id, timezone.localdate(clearance.completed_at),
+                clearance.type_of_separation, bucket_for(seconds),
+            )
+            totals[key][0] += 1
+            totals[key][1] += seconds
+        ClearanceRollup.objects.all().delete()
+        ClearanceRollup.objects.bulk_create(
+            [
+                ClearanceRollup(department_id=department_id, day=day, type_of_separation=separation,
+                                bucket=bucket, count=count, total_seconds=seconds)
+                for (department_id, day, separation, bucket), (count, seconds) in totals.items()
+            ],
+            batch_size=500,
+        )
+    return len(states), len(totals)
+
+
+def percentile(histogram, fraction):
+    """
+    Estimate a percentile in hours from ``{bucket: (count, seconds)}``: the
+    mean duration of the bucket the percentile falls in. The buckets are too
+    wide to interpolate in, but each one's total is known, so the estimate
+    never leaves the range of the durations actually recorded.
+    """
+    total = sum(count for count, _ in histogram.values())
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for bucket in sorted(histogram):
+        count, seconds = histogram[bucket]
+        if count and seen + count >= rank:
+            return max(seconds, 0) / count / 3600
+        seen += count
+    return None
+
+
+def time_to_clear(rollups):
+    """
+    Median and p90 (estimated, see :func:`percentile`) and mean hours per
+    department, separation type and month of completion.
+    """
+    rows = (
+        rollups.annotate(month=TruncMonth("day"))
+        .values("department_id", "department__name", "type_of_separation", "month", "bucket")
+        .annotate(count=Sum("count"), seconds=Sum("total_seconds"))
+        .order_by()
+    )
+    groups = {}
+    for row in rows:
+        key = (row["month"], row["department__name"], row["department_id"], row["type_of_separation"])
+        group = groups.setdefault(key, {"histogram": {}, "count": 0, "seconds": 0.0})
+        group["histogram"][row["bucket"]] = (row["count"], row["seconds"])
+        group["count"] += row["count"]
+        group["seconds"] += row["seconds"]
+
+    result = []
+    for (month, department, department_id, separation), group in sorted(groups.items()):
+        if not group["count"]:
+            continue  # every clearance in it was reopened
+        median, p90 = percentile(group["histogram"], 0.5), percentile(group["histogram"], 0.9)
+        result.append({
+            "month": month.strftime("%Y-%m"),
+            "department_id": department_id,
+            "department": department,
+            "type_of_separation": separation,
+            "count": group["count"],
+            "median_hours": round(median, 1),
+            "p90_hours": round(p90, 1),
+            "mean_hours": round(group["seconds"] / group["count"] / 3600, 1),
+        })
+    return result
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class App1Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app1'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import checklists, reports  # noqa: F401  (register their job handlers)
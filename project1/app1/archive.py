@@ -0,0 +1,61 @@
+"""
+Moves finished clearances out of the live tables.
+
+Each archived employee becomes one ArchivedEmployee row holding the list row
+and the clearance payload the API served for it, so the read path can return
+them unchanged without the response and comment rows.
+"""
+from django.db import transaction
+
+from . import changefeed, rows
+from .models import ArchivedEmployee
+
+
+def archive_employees(queryset, batch_size=200, progress=None):
+    """Archive every employee in ``queryset`` in batches of ``batch_size``."""
+    from .views import EmployeeViewSet
+
+    total = 0
+    while True:
+        ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return total
+        with changefeed.batch():
+            batch = queryset.filter(id__in=ids)
+            employee_rows = {row["id"]: row for row in rows.employee_rows(batch)}
+            archived = []
+            for employee in batch:
+                archived.append(ArchivedEmployee(
+                    employee_pk=employee.pk,
+                    employee_id=employee.employee_id,
+                    employee_name=employee.employee_name,
+                    employee_department=employee.employee_department,
+                    type_of_separation=employee.type_of_separation,
+                    last_work_date=employee.last_work_date,
+                    created_at=employee.created_at,
+                    snapshot={
+                        "employee": employee_rows[employee.pk],
+                        "clearance": EmployeeViewSet.build_responses_payload(employee),
+                    },
+                ))
+            ArchivedEmployee.objects.bulk_create(archived)
+
+            through = ArchivedEmployee.assigned_departments.through
+            archived_ids = dict(ArchivedEmployee.objects.filter(employee_pk__in=ids).values_list("employee_pk", "id"))
+            through.objects.bulk_create([
+                through(archivedemployee_id=archived_ids[pk], department_id=department_id)
+                for pk, row in employee_rows.items()
+                for department_id in row["assigned_departments"]
+            ])
+            batch.delete()
+        total += len(ids)
+        if progress:
+            progress(total)
+
+
+def archived_rows(queryset):
+    """Employee list rows for archived employees, flagged as archived."""
+    return [
+        {**snapshot["employee"], "archived": True}
+        for snapshot in queryset.order_by("-created_at").values_list("snapshot", flat=True)
+    ]
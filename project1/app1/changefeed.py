@@ -0,0 +1,67 @@
+"""
+Change log recording for client-side delta sync.
+
+Signal receivers call :func:`record` for every write to the synced models.
+Inside :func:`batch` the entries are buffered and written with a single bulk
+insert just before the surrounding transaction commits; outside of it each
+entry is inserted immediately, still within whatever transaction the write
+itself runs in.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .models import ChangeLogEntry
+
+_state = threading.local()
+
+
+def _buffer():
+    return getattr(_state, "buffer", None)
+
+
+def record(model, object_id, action, department_id=None):
+    key = (model, object_id, action, department_id)
+    buffer = _buffer()
+    if buffer is None:
+        ChangeLogEntry.objects.create(
+            model=model, object_id=object_id, action=action, department_id=department_id
+        )
+        return
+    # Repeated writes to the same row collapse into one entry, kept in the
+    # position of the latest write.
+    buffer.pop(key, None)
+    buffer[key] = None
+
+
+def mark():
+    """Snapshot of the pending entries, for :func:`restore` after a rollback."""
+    buffer = _buffer()
+    return None if buffer is None else dict(buffer)
+
+
+def restore(snapshot):
+    if snapshot is not None and _buffer() is not None:
+        _state.buffer = snapshot
+
+
+@contextmanager
+def batch():
+    """Run the block in a transaction and log its changes with one insert."""
+    if _buffer() is not None:
+        yield
+        return
+
+    _state.buffer = {}
+    try:
+        with transaction.atomic():
+            yield
+            entries = [
+                ChangeLogEntry(model=model, object_id=object_id, action=action, department_id=department_id)
+                for model, object_id, action, department_id in _state.buffer
+            ]
+            if entries:
+                ChangeLogEntry.objects.bulk_create(entries, batch_size=500)
+    finally:
+        _state.buffer = None
@@ -0,0 +1,292 @@
+"""
+Set-based checklist fan-out.
+
+Writing a department's questions to every assigned employee one
+``get_or_create`` at a time costs a few queries per employee per question.
+These helpers do it with one bulk insert per table instead. Bulk inserts
+skip the model signals, so the change-feed entries, cache invalidation and
+analytics tracking those would have done are done here explicitly.
+"""
+from django.db.models import Max, Q
+
+from . import analytics, changefeed, deferred, jobs, payload_cache
+from .models import Department, DepartmentEmployeeComment, Employee, EmployeeQuestionResponse, Question
+
+BATCH_SIZE = 1000
+# Employees per transaction in assignment jobs.
+ASSIGN_CHUNK_SIZE = 200
+# Question edits and deletes affecting more employees than this finish in a job.
+CASCADE_INLINE_LIMIT = ASSIGN_CHUNK_SIZE
+
+
+def applies_to(question, employee_department, department_name):
+    """Concerned questions are only for employees leaving the department that owns them."""
+    return not question.is_concerned_question or employee_department == department_name
+
+
+def fan_out(department, questions, employee_ids=None):
+    """
+    Create the missing checklist rows for ``questions`` (all of ``department``)
+    for every employee assigned to the department, or only for
+    ``employee_ids``, and recompute the status of each affected employee once.
+    Returns the affected employee ids.
+    """
+    employees = Employee.objects.filter(assigned_departments=department)
+    if employee_ids is not None:
+        employees = employees.filter(pk__in=employee_ids)
+    employees = list(employees.values_list("id", "employee_department"))
+    if not employees or not questions:
+        return set()
+
+    responses = [
+        EmployeeQuestionResponse(employee_id=employee_id, department=department, question=question)
+        for employee_id, employee_department in employees
+        for question in questions
+        if applies_to(question, employee_department, department.name)
+    ]
+    # Rows that already exist are skipped by the insert; anything above the
+    # previous highest id for these questions is what it added.
+    created = _inserted(
+        EmployeeQuestionResponse,
+        responses,
+        EmployeeQuestionResponse.objects.filter(question__in=questions),
+    )
+    affected = set()
+    for response_id, employee_id in created.values_list("id", "employee_id"):
+        changefeed.record("responses", response_id, "upsert", department.pk)
+        affected.add(employee_id)
+
+    # Every employee with an item from this department gets its (empty) comment row.
+    ensure_comments(department, affected)
+    touched(department, affected)
+    return affected
+
+
+def ensure_comments(department, employee_ids):
+    comments = [
+        DepartmentEmployeeComment(employee_id=employee_id, department=department, comment_text="", department_head_id="")
+        for employee_id in employee_ids
+    ]
+    created = _inserted(
+        DepartmentEmployeeComment,
+        comments,
+        DepartmentEmployeeComment.objects.filter(department=department, employee_id__in=employee_ids),
+    )
+    for comment_id in created.values_list("id", flat=True):
+        changefeed.record("department-comments", comment_id, "upsert", department.pk)
+
+
+def _inserted(model, objs, scope):
+    """Bulk insert ``objs`` skipping conflicts; returns ``scope`` narrowed to the new rows."""
+    last_id = scope.aggregate(last=Max("id"))["last"] or 0
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return scope.filter(id__gt=last_id)
+
+
+def touched(department, employee_ids):
+    """What the save/delete signals would have done for bulk checklist writes."""
+    _invalidate(department, employee_ids)
+    recompute(employee_ids)
+
+
+def _invalidate(department, employee_ids):
+    payload_cache.invalidate("employee", employee_ids)
+    payload_cache.invalidate("department", [department.pk])
+    analytics.track([(employee_id, department.pk) for employee_id in employee_ids])
+
+
+def create_questions(department, items):
+    """Insert ``items`` (dicts of question fields) for ``department`` and fan them out."""
+    questions = Question.objects.bulk_create(
+        [Question(department=department, **item) for item in items], batch_size=BATCH_SIZE
+    )
+    if questions and questions[0].pk is None:
+        # Backends that can't return ids from a bulk insert.
+        questions = list(Question.objects.filter(department=department).order_by("-id")[:len(questions)])[::-1]
+    for question in questions:
+        changefeed.record("questions", question.pk, "upsert", department.pk)
+    return questions, fan_out(department, questions)
+
+
+def replace_questions(department, items):
+    """
+    Make ``items`` the department's whole checklist. Questions whose text and
+    kind are unchanged are kept with their answers; the others are deleted
+    and the new ones created and fanned out.
+    """
+    keep, remove = [], []
+    wanted = [(item["text"], item.get("is_concerned_question", False)) for item in items]
+    for question in department.questions.order_by("id"):
+        key = (question.text, question.is_concerned_question)
+        if key in wanted:
+            wanted.remove(key)
+            keep.append(question)
+        else:
+            remove.append(question.pk)
+
+    if remove:
+        affected = set(
+            EmployeeQuestionResponse.objects.filter(question_id__in=remove).values_list("employee_id", flat=True)
+        )
+        # The cascade's delete signals record the change feed and invalidate
+        # the payloads; touched() adds the status recompute they don't do.
+        Question.objects.filter(pk__in=remove).delete()
+        touched(department, affected)
+
+    created, _ = create_questions(
+        department, [{"text": text, "is_concerned_question": concerned} for text, concerned in wanted]
+    )
+    return keep, created, len(remove)
+
+
+def reapply_question(question, employee_ids=None):
+    """
+    Bring ``question``'s checklist rows in line with its department and kind
+    after an edit: rows filed under another department, or for employees a
+    concerned question no longer applies to, are deleted, and the missing
+    rows are created. Limited to ``employee_ids`` if given. Returns the
+    affected employee ids.
+    """
+    responses = EmployeeQuestionResponse.objects.filter(question=question)
+    if employee_ids is not None:
+        responses = responses.filter(employee_id__in=employee_ids)
+    wrong = ~Q(department_id=question.department_id)
+    if question.is_concerned_question:
+        wrong |= ~Q(employee__employee_department=question.department.name)
+    stale = responses.filter(wrong)
+
+    removed = set(stale.values_list("employee_id", flat=True))
+    if removed:
+        # The delete signals record the change feed, invalidate the payloads
+        # and track the clearances; the statuses are recomputed below.
+        stale.delete()
+        recompute(removed)
+    return removed | fan_out(question.department, [question], employee_ids)
+
+
+def question_cascade_scope(question, department_id):
+    """Employees an edit of ``question`` (previously of ``department_id``) may affect, in one query."""
+    return list(
+        Employee.objects.filter(
+            Q(assigned_departments__in={question.department_id, department_id}) | Q(responses__question=question)
+        )
+        .values_list("id", flat=True)
+        .distinct()
+        .order_by("id")
+    )
+
+
+def delete_question(question):
+    """
+    Delete ``question`` and its rows. The rows go in one DELETE rather than
+    the ORM cascade's per-row signals, whose change feed entries and
+    invalidations are made here instead. Returns the affected employee ids,
+    whose statuses still need :func:`recompute`.
+    """
+    department = question.department
+    responses = EmployeeQuestionResponse.objects.filter(question=question)
+    affected = set()
+    for response_id, employee_id in responses.values_list("id", "employee_id"):
+        changefeed.record("responses", response_id, "delete", department.pk)
+        affected.add(employee_id)
+    responses._raw_delete(responses.db)
+    question.delete()
+    _invalidate(department, affected)
+    return affected
+
+
+def recompute(employee_ids):
+    """The status update the delete signals don't do, once per employee."""
+    if not deferred.add("employee_status", employee_ids):
+        Employee.recompute_statuses(employee_ids)
+
+
+def provision(department, employee_ids):
+    """Give employees newly assigned to ``department`` its checklist and comment row."""
+    fan_out(department, list(department.questions.all()), employee_ids)
+    ensure_comments(department, employee_ids)
+
+
+def assign(employee_ids, department_ids):
+    """Assign departments to employees with one M2M insert. Returns the number of new pairs."""
+    through = Employee.assigned_departments.through
+    existing = set(
+        through.objects.filter(employee_id__in=employee_ids, department_id__in=department_ids)
+        .values_list("employee_id", "department_id")
+    )
+    pairs = [
+        (employee_id, department_id)
+        for employee_id in employee_ids
+        for department_id in department_ids
+        if (employee_id, department_id) not in existing
+    ]
+    through.objects.bulk_create(
+        [through(employee_id=employee_id, department_id=department_id) for employee_id, department_id in pairs],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    # What log_assignment_changed and invalidate_assignment_payloads would have done.
+    for employee_id, _ in pairs:
+        changefeed.record("employees", employee_id, "upsert")
+    payload_cache.invalidate("employee", {employee_id for employee_id, _ in pairs})
+
+    for department in Department.objects.filter(pk__in={department_id for _, department_id in pairs}):
+        provision(department, [employee_id for employee_id, department_id in pairs if department_id == department.pk])
+    # Employees whose new department has no questions still count it as not done.
+    if not deferred.add("employee_status", {employee_id for employee_id, _ in pairs}):
+        Employee.recompute_statuses({employee_id for employee_id, _ in pairs})
+    return len(pairs)
+
+
+def unassign(employee_ids, department_ids):
+    """Remove assignments with one M2M delete; answers are kept in case of reassignment."""
+    through = Employee.assigned_departments.through
+    rows = through.objects.filter(employee_id__in=employee_ids, department_id__in=department_ids)
+    pairs = list(rows.values_list("employee_id", "department_id"))
+    rows.delete()
+    for employee_id, department_id in pairs:
+        changefeed.record("employees", employee_id, "upsert")
+        changefeed.record("employees", employee_id, "delete", department_id)
+    affected = {employee_id for employee_id, _ in pairs}
+    payload_cache.invalidate("employee", affected)
+    if not deferred.add("employee_status", affected):
+        Employee.recompute_statuses(affected)
+    return len(pairs)
+
+
+def _assignment_job(job, progress):
+    employee_ids = job.params["employee_ids"]
+    assigned = unassigned = 0
+    for offset in range(job.processed, len(employee_ids), ASSIGN_CHUNK_SIZE):
+        chunk = employee_ids[offset:offset + ASSIGN_CHUNK_SIZE]
+        with changefeed.batch(), deferred.collect():
+            if job.params.get("assign"):
+                assigned += assign(chunk, job.params["assign"])
+            if job.params.get("unassign"):
+                unassigned += unassign(chunk, job.params["unassign"])
+        progress(offset + len(chunk))
+    return {"assigned": assigned, "unassigned": unassigned}
+
+
+def _question_job(job, progress):
+    """Finish a question edit (``question``) or delete (no ``question``) for ``employee_ids``."""
+    question = (
+        Question.objects.select_related("department").filter(pk=job.params.get("question")).first()
+        if job.params.get("question") else None
+    )
+    employee_ids = job.params["employee_ids"]
+    affected = 0
+    for offset in range(job.processed, len(employee_ids), ASSIGN_CHUNK_SIZE):
+        chunk = employee_ids[offset:offset + ASSIGN_CHUNK_SIZE]
+        with changefeed.batch(), deferred.collect():
+            if question is not None:
+                affected += len(reapply_question(question, chunk))
+            else:
+                recompute(chunk)
+                affected += len(chunk)
+        progress(offset + len(chunk))
+    return {"employees": affected}
+
+
+jobs.register("assign_departments", _assignment_job)
+jobs.register("question_cascade", _question_job)
@@ -0,0 +1,69 @@
+"""
+Optimistic concurrency for versioned rows.
+
+A write names the version it was based on, via ``If-Match: "<version>"`` or
+a ``version`` field in the body (by default, the version just loaded). The
+write first claims the row with ``UPDATE ... SET version = version + 1
+WHERE id = %s AND version = %s``; if no row matched, someone else got there
+first and the client gets a 409 with the row's current state. No lock is
+held beyond the single conditional UPDATE.
+"""
+from django.db.models import F
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This record was changed by someone else. Reload it and try again."
+    default_code = "conflict"
+
+
+def expected_version(request, instance):
+    value = request.headers.get("If-Match")
+    if value is None and hasattr(request.data, "get"):
+        value = request.data.get("version")
+    if value in (None, "", "*"):
+        return instance.version
+    try:
+        return int(str(value).removeprefix("W/").strip('"'))
+    except ValueError:
+        raise ValidationError({"detail": "If-Match / version must be a record version number."})
+
+
+def claim(instance, expected, serializer_class, context=None):
+    """Bump ``instance``'s version if it is still ``expected``, else raise VersionConflict."""
+    model = type(instance)
+    if not model.objects.filter(pk=instance.pk, version=expected).update(version=F("version") + 1):
+        current = model.objects.filter(pk=instance.pk).first()
+        conflict = VersionConflict()
+        # Set after construction: APIException would coerce every value to a string.
+        conflict.detail = {
+            "detail": VersionConflict.default_detail,
+            "current": serializer_class(current, context=context).data if current else None,
+        }
+        raise conflict
+    # The claimed value is what the caller's following save() writes back.
+    instance.version = expected + 1
+
+
+class VersionedModelMixin:
+    """
+    ``claim_version()`` for the view's write paths, and the version sent as
+    ETag on single-object responses.
+    """
+
+    def claim_version(self, instance):
+        claim(
+            instance,
+            expected_version(self.request, instance),
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, "data", None)
+        if response.status_code < 300 and isinstance(data, dict) and "version" in data:
+            response["ETag"] = f'"{data["version"]}"'
+        return response
@@ -0,0 +1,52 @@
+"""
+Deferral of per-write follow-up work.
+
+Code that would normally recompute or invalidate something after each write
+calls :func:`add`; inside a :func:`collect` block the ids are accumulated and
+each registered handler runs once, with all of them, when the block ends.
+Outside a block :func:`add` returns False and the caller does the work
+immediately.
+"""
+import threading
+from contextlib import contextmanager
+
+_state = threading.local()
+_handlers = {}
+
+
+def register(kind, handler):
+    """Handlers run in registration order, each receiving a set of ids."""
+    _handlers[kind] = handler
+
+
+def add(kind, ids):
+    pending = getattr(_state, "pending", None)
+    if pending is None or kind == getattr(_state, "flushing", None):
+        return False
+    pending.setdefault(kind, set()).update(ids)
+    return True
+
+
+@contextmanager
+def collect():
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+
+    _state.pending = {}
+    try:
+        yield
+        # Handlers may defer more work (a status change invalidates cached
+        # payloads), so drain until nothing new is added.
+        while _state.pending:
+            pending, _state.pending = _state.pending, {}
+            for kind, handler in _handlers.items():
+                if kind in pending:
+                    # The handler's own calls of this kind run immediately.
+                    _state.flushing = kind
+                    try:
+                        handler(pending[kind])
+                    finally:
+                        _state.flushing = None
+    finally:
+        _state.pending = None
@@ -0,0 +1,101 @@
+"""
+Background jobs for operations too large for one request.
+
+A view calls :func:`enqueue` and returns the Job for the client to poll; the
+``run_jobs`` command claims queued jobs and runs the handler registered for
+their kind. Handlers work in chunks, each in its own transaction, and report
+progress after every chunk. A job whose runner dies is picked up again once
+its lease expires and resumes after the last chunk it reported, so handlers
+must make each chunk safe to redo.
+"""
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import changefeed
+from .models import Job
+
+LEASE_SECONDS = 600
+
+_handlers = {}
+
+
+def register(kind, handler):
+    """``handler(job, progress)`` runs the job; ``progress(processed)`` records how far it got."""
+    _handlers[kind] = handler
+
+
+def enqueue(kind, params, total=0, user=None):
+    return Job.objects.create(kind=kind, params=params, total=total, created_by=user)
+
+
+def run_now(kind, params, total=0, user=None):
+    """Create a job and run it in this process, for work small enough to do inline."""
+    job = enqueue(kind, params, total=total, user=user)
+    Job.objects.filter(pk=job.pk).update(status="running", started_at=timezone.now(), lease_until=_lease())
+    job.refresh_from_db()
+    # The caller's transaction is usually still open, so the handler's chunks
+    # aren't committed one by one; a savepoint keeps a failure from leaving
+    # half a job behind.
+    _run(job, savepoint=True)
+    job.refresh_from_db()
+    return job
+
+
+def _lease():
+    return timezone.now() + timedelta(seconds=LEASE_SECONDS)
+
+
+def _claim():
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status__in=["queued", "running"])
+            .exclude(status="running", lease_until__gte=now)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = "running"
+        job.started_at = job.started_at or now
+        job.lease_until = _lease()
+        job.save(update_fields=["status", "started_at", "lease_until"])
+    return job
+
+
+def _run(job, savepoint=False):
+    def progress(processed):
+        job.processed = processed
+        Job.objects.filter(pk=job.pk).update(processed=processed, lease_until=_lease())
+
+    snapshot = changefeed.mark()
+    try:
+        with transaction.atomic() if savepoint else nullcontext():
+            result = _handlers[job.kind](job, progress)
+    except Exception:
+        # Entries buffered for the rolled-back writes must not be logged.
+        changefeed.restore(snapshot)
+        Job.objects.filter(pk=job.pk).update(
+            status="failed", error=traceback.format_exc()[-5000:], finished_at=timezone.now(), lease_until=None
+        )
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status="done", result=result or {}, finished_at=timezone.now(), lease_until=None
+        )
+
+
+def run_pending(limit=10):
+    """Run up to ``limit`` claimable jobs, oldest first. Returns how many ran."""
+    ran = 0
+    while ran < limit:
+        job = _claim()
+        if job is None:
+            break
+        _run(job)
+        ran += 1
+    return ran
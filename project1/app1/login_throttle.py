@@ -0,0 +1,60 @@
+"""
+Failed-login throttling.
+
+Failed logins are counted per identity (username or email) and per client
+IP in the default cache, over a fixed window. Once either count reaches
+its limit, attempts are turned away before any user lookup or password
+hash, which is what makes a burst of retries cheap. A successful login
+clears its identity's count.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def client_ip(request):
+    """REMOTE_ADDR, or the address the trusted proxies in front of us saw."""
+    proxies = settings.LOGIN_THROTTLE_PROXY_COUNT
+    forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _keys(scope, identity, request):
+    return (
+        f"login:{scope}:id:{str(identity or '').strip().lower()}",
+        f"login:{scope}:ip:{client_ip(request)}",
+    )
+
+
+def blocked(scope, identity, request):
+    """True if ``identity`` or the client IP used up its failed attempts."""
+    identity_key, ip_key = _keys(scope, identity, request)
+    counts = cache.get_many([identity_key, ip_key])
+    return (
+        counts.get(identity_key, 0) >= settings.LOGIN_THROTTLE_IDENTITY_LIMIT
+        or counts.get(ip_key, 0) >= settings.LOGIN_THROTTLE_IP_LIMIT
+    )
+
+
+def failed(scope, identity, request):
+    for key in _keys(scope, identity, request):
+        # add() starts the window; incr() keeps its expiry.
+        cache.add(key, 0, settings.LOGIN_THROTTLE_WINDOW)
+        try:
+            cache.incr(key)
+        except ValueError:  # expired in between
+            cache.set(key, 1, settings.LOGIN_THROTTLE_WINDOW)
+
+
+def succeeded(scope, identity, request):
+    cache.delete(_keys(scope, identity, request)[0])
+
+
+def rejection():
+    """Body, status and headers of a throttled login response."""
+    return (
+        {"error": "Too many failed login attempts. Try again later."},
+        429,
+        {"Retry-After": str(settings.LOGIN_THROTTLE_WINDOW)},
+    )
@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app1.archive import archive_employees
+from app1.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Move done employees whose last work date is before the cutoff into the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", help="Cutoff date (YYYY-MM-DD) for last_work_date.")
+        parser.add_argument("--older-than-days", type=int, default=365, help="Cutoff relative to today when --before is not given.")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            try:
+                cutoff = date.fromisoformat(options["before"])
+            except ValueError:
+                raise CommandError("--before must be a date in YYYY-MM-DD format")
+        else:
+            cutoff = date.today() - timedelta(days=options["older_than_days"])
+
+        candidates = Employee.objects.filter(status="done", last_work_date__lt=cutoff)
+        count = candidates.count()
+        if options["dry_run"]:
+            self.stdout.write(f"{count} employees would be archived (last work date before {cutoff}).")
+            return
+
+        archived = archive_employees(
+            candidates,
+            batch_size=options["batch_size"],
+            progress=lambda done: self.stdout.write(f"  archived {done}/{count}"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} employees with last work date before {cutoff}."))
@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Connection handling strategies compared, as environment overrides for settings.py.
+PROFILES = {
+    "per-request": {"DB_CONN_MAX_AGE": "0", "DB_POOL": "off"},
+    "persistent": {"DB_CONN_MAX_AGE": "600", "DB_POOL": "off"},
+    "pool": {"DB_POOL": "on"},  # PostgreSQL only
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare connection handling (a connection per request, persistent connections, and the "
+        "PostgreSQL pool) by driving the real WSGI handler from several threads against DATABASE_URL, "
+        "and report throughput, tail latency and how many database connections were opened."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent request threads (gthread workers).")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per thread.")
+        parser.add_argument("--path", default="/employees/summary/")
+        parser.add_argument("--user", help="Username whose token is sent (default: first staff user with a token).")
+        parser.add_argument("--profile", choices=sorted(PROFILES), action="append", help="Profiles to run (default: all that apply).")
+        parser.add_argument("--child", action="store_true", help="(internal) run one profile in this process.")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            return self.child(options)
+
+        is_postgres = settings.DATABASES["default"]["ENGINE"].endswith("postgresql")
+        profiles = options["profile"] or [name for name in PROFILES if name != "pool" or is_postgres]
+        if "pool" in profiles and not is_postgres:
+            self.stderr.write("The pool profile needs PostgreSQL; skipping it.")
+            profiles.remove("pool")
+
+        self.stdout.write(
+            f"{options['threads']} threads x {options['requests']} GET {options['path']} on "
+            f"{settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1]}"
+        )
+        self.stdout.write(f"{'profile':<13}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'connections':>13}")
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_connections", "--child"]
+        for name in profiles:
+            command = manage + [
+                "--threads", str(options["threads"]), "--requests", str(options["requests"]), "--path", options["path"],
+            ]
+            if options["user"]:
+                command += ["--user", options["user"]]
+            env = {**os.environ, **PROFILES[name], "GUNICORN_PROFILE": "gthread", "GUNICORN_THREADS": str(options["threads"])}
+            output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{name:<13}{result['rps']:>9.1f}{result['p50']:>9.1f}{result['p99']:>9.1f}"
+                f"{result['max']:>9.1f}{result['errors']:>8}{result['connections']:>13}"
+            )
+
+    def child(self, options):
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.db import connection
+        from django.db.backends.signals import connection_created
+        from django.test import RequestFactory
+        from rest_framework.authtoken.models import Token
+
+        tokens = Token.objects.select_related("user")
+        token = tokens.filter(user__username=options["user"]).first() if options["user"] else tokens.filter(user__is_staff=True).first()
+        # Without a token the request still authenticates against the database, then gets a 401.
+        key = token.key if token else "0" * 40
+        connection.close()
+
+        opened = []
+        lock = threading.Lock()
+
+        def count(sender, connection, **kwargs):
+            with lock:
+                opened.append(1)
+
+        connection_created.connect(count)
+
+        # The full WSGI path, so request_started/request_finished close or
+        # return connections exactly as they would under gunicorn.
+        application = WSGIHandler()
+        environ = RequestFactory().get(options["path"], HTTP_AUTHORIZATION=f"Token {key}").environ
+
+        def worker(_):
+            latencies, errors = [], 0
+            for _ in range(options["requests"]):
+                start = time.perf_counter()
+                statuses = []
+                body = application(dict(environ), lambda status, headers, *args: statuses.append(status))
+                try:
+                    b"".join(body)
+                finally:
+                    body.close()  # sends request_finished
+                latencies.append(time.perf_counter() - start)
+                if not statuses or statuses[0][0] == "5":
+                    errors += 1
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options["threads"]) as pool:
+            results = list(pool.map(worker, range(options["threads"])))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for thread_latencies, _ in results for latency in thread_latencies)
+        pool_stats = getattr(connection, "pool", None)
+        if pool_stats is not None:
+            # Checkouts from the pool also fire connection_created; count real connections.
+            connections_opened = pool_stats.get_stats().get("connections_num", 0)
+        else:
+            connections_opened = len(opened)
+        self.stdout.write(json.dumps({
+            "rps": len(latencies) / elapsed,
+            "p50": latencies[len(latencies) // 2],
+            "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            "max": latencies[-1],
+            "errors": sum(errors for _, errors in results),
+            "connections": connections_opened,
+        }))
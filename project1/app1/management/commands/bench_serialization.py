@@ -0,0 +1,107 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from app1 import rows
+from app1.models import Department, Employee, Question, EmployeeQuestionResponse, DepartmentEmployeeComment
+from app1.renderers import FastJSONRenderer, orjson
+from app1.serializers import (
+    EmployeeSerializer,
+    QuestionSerializer,
+    EmployeeQuestionResponseSerializer,
+    DepartmentEmployeeCommentSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = "Compare ModelSerializer + JSONRenderer against values() rows + FastJSONRenderer on large lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows instead of rolling back.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["rows"])
+            self.stdout.write(f"orjson: {'yes' if orjson else 'no (stdlib fallback)'}")
+            self.stdout.write(f"{'list':<12}{'rows':>8}{'serializer':>14}{'fast':>10}{'speedup':>10}  identical")
+            cases = [
+                ("employees", Employee.objects.order_by("-created_at"), EmployeeSerializer, rows.employee_rows),
+                ("questions", Question.objects.all(), QuestionSerializer, rows.question_rows),
+                ("responses", EmployeeQuestionResponse.objects.all(), EmployeeQuestionResponseSerializer, rows.response_rows),
+                ("comments", DepartmentEmployeeComment.objects.all(), DepartmentEmployeeCommentSerializer, rows.comment_rows),
+            ]
+            for name, queryset, serializer_class, row_builder in cases:
+                self.compare(name, queryset, serializer_class, row_builder, options["repeat"])
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def compare(self, name, queryset, serializer_class, row_builder, repeat):
+        def slow():
+            return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+        def fast():
+            return FastJSONRenderer().render(row_builder(queryset.all()))
+
+        slow_time, slow_body = self.best_of(slow, repeat)
+        fast_time, fast_body = self.best_of(fast, repeat)
+        self.stdout.write(
+            f"{name:<12}{queryset.count():>8}{slow_time * 1000:>12.1f}ms{fast_time * 1000:>8.1f}ms"
+            f"{slow_time / fast_time:>9.1f}x  {slow_body == fast_body}"
+        )
+
+    @staticmethod
+    def best_of(func, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def seed(self, count):
+        tag = int(time.time())
+        Department.objects.bulk_create([
+            Department(name=f"bench-{tag}-{i}", email=f"bench-{tag}-{i}@example.com", is_assigned_department=True)
+            for i in range(4)
+        ])
+        departments = list(Department.objects.filter(name__startswith=f"bench-{tag}-"))
+        Question.objects.bulk_create([
+            Question(department=dept, text=f"Return item {i} — {dept.name}", is_concerned_question=i == 0)
+            for dept in departments
+            for i in range(5)
+        ])
+        Employee.objects.bulk_create([
+            Employee(
+                employee_name=f"Employee {i}",
+                employee_id=f"bench-{tag}-{i}",
+                employee_department=departments[i % len(departments)].name,
+                designation="Engineer",
+                last_work_date=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+                type_of_separation="resignation",
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        employees = list(Employee.objects.filter(employee_id__startswith=f"bench-{tag}-").order_by("id"))
+
+        through = Employee.assigned_departments.through
+        through.objects.bulk_create([
+            through(employee_id=emp.id, department_id=dept.id)
+            for i, emp in enumerate(employees)
+            for dept in (departments[i % 4], departments[(i + 1) % 4])
+        ], batch_size=1000)
+        DepartmentEmployeeComment.objects.bulk_create([
+            DepartmentEmployeeComment(employee=emp, department=dept, comment_text="ok", department_head_id="H1")
+            for i, emp in enumerate(employees)
+            for dept in (departments[(i + 1) % 4], departments[i % 4])
+        ], batch_size=1000)
+        questions = list(Question.objects.filter(department__in=departments))
+        EmployeeQuestionResponse.objects.bulk_create([
+            EmployeeQuestionResponse(employee=emp, department=q.department, question=q, is_checked=i % 2 == 0)
+            for i, (emp, q) in enumerate(zip(employees, questions * (count // len(questions) + 1)))
+        ], batch_size=1000)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app1 import reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the clearance certificate (HTML and CSV) of every exit completed in a month, plus a "
+        "summary, on a process pool and write them to a zip under MEDIA_ROOT/reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="YYYY-MM (default: last month).")
+        parser.add_argument("--workers", type=int, help="Rendering processes (default: REPORT_WORKERS, else one per CPU).")
+        parser.add_argument("--output", help="Zip file to write (default: MEDIA_ROOT/reports/clearances-YYYY-MM.zip).")
+
+    def handle(self, *args, **options):
+        if options["month"]:
+            try:
+                year, month = reports.parse_month(options["month"])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        else:
+            today = timezone.localdate()
+            year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+
+        def progress(rendered, total):
+            self.stdout.write(f"\rRendered {rendered}/{total}", ending="")
+            self.stdout.flush()
+
+        path = options["output"] or reports.default_path(year, month)
+        result = reports.generate(year, month, path=path, workers=options["workers"], progress=progress)
+        self.stdout.write("")
+        self.stdout.write(f"Wrote {result['employees']} clearances for {year}-{month:02d} to {path}.")
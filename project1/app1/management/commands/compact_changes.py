@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from app1.models import ChangeLogEntry, ChangeLogHorizon
+
+
+class Command(BaseCommand):
+    help = "Compact the change log to the latest entry per row and drop entries past the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Retention window in days.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        # Compaction: a client behind an older entry still gets the row's
+        # current state from the newest one, so only that needs to survive.
+        latest = ChangeLogEntry.objects.values("model", "object_id", "department_id").annotate(last=Max("id")).values("last")
+        compacted = self.delete_in_batches(ChangeLogEntry.objects.exclude(id__in=latest), batch_size)
+
+        # Retention: clients whose cursor predates the horizon must resync.
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        expired = ChangeLogEntry.objects.filter(created_at__lt=cutoff)
+        pruned_through = expired.aggregate(last=Max("id"))["last"]
+        pruned = 0
+        if pruned_through is not None:
+            with transaction.atomic():
+                horizon, _ = ChangeLogHorizon.objects.get_or_create(pk=1)
+                horizon.pruned_through = max(horizon.pruned_through, pruned_through)
+                horizon.save()
+            pruned = self.delete_in_batches(ChangeLogEntry.objects.filter(id__lte=pruned_through), batch_size)
+
+        self.stdout.write(f"Compacted {compacted} entries, pruned {pruned} entries older than {options['days']} days.")
+
+    @staticmethod
+    def delete_in_batches(queryset, batch_size):
+        total = 0
+        while True:
+            ids = list(queryset.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return total
+            with transaction.atomic():
+                total += ChangeLogEntry.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,302 @@
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PASSWORD = "loadtest"
+
+# Traceback text that identifies each kind of lock failure, per backend.
+LOCK_ERRORS = ("database is locked", "database table is locked", "lock timeout", "could not obtain lock")
+DEADLOCKS = ("deadlock detected", "could not serialize access")
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app under gunicorn against a scratch database and replay concurrent department "
+        "sessions (log in, open an employee, tick items, save the comment) and HR sessions (poll "
+        "the summary, open clearances) on overlapping employees. Reports throughput, p50/p99 "
+        "latency, conflicts, lock errors and deadlocks per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--departments", type=int, default=8, help="Department sessions (one per department).")
+        parser.add_argument("--hr-sessions", type=int, default=2)
+        parser.add_argument("--employees", type=int, default=20, help="Employees shared by every department.")
+        parser.add_argument("--questions", type=int, default=6, help="Checklist items per department.")
+        parser.add_argument("--duration", type=float, default=20, help="Seconds to run the sessions for.")
+        parser.add_argument("--think", type=float, default=0, help="Pause between a session's steps, in ms.")
+        parser.add_argument("--workers", type=int, default=4, help="Gunicorn worker processes.")
+        parser.add_argument("--profile", choices=["sync", "gthread"], default="sync", help="GUNICORN_PROFILE.")
+        parser.add_argument("--threads", type=int, default=4, help="GUNICORN_THREADS with --profile gthread.")
+        parser.add_argument(
+            "--database-url",
+            help="Scratch database to use instead of a temporary SQLite file. It is migrated and seeded.",
+        )
+        parser.add_argument("--seed", action="store_true", help="(internal) seed the scratch database.")
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            return self.seed(options)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = options["database_url"] or f"sqlite:///{os.path.join(tmp, 'loadtest.sqlite3')}"
+            port = _free_port()
+            env = {
+                **os.environ,
+                "DATABASE_URL": database_url,
+                "DJANGO_DEBUG": "False",
+                "PORT": str(port),
+                "WEB_CONCURRENCY": str(options["workers"]),
+                "GUNICORN_PROFILE": options["profile"],
+                "GUNICORN_THREADS": str(options["threads"]),
+            }
+            manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+            subprocess.run(manage + ["migrate", "-v0"], env=env, check=True)
+            subprocess.run(
+                manage + ["loadtest", "--seed", "--departments", str(options["departments"]),
+                          "--employees", str(options["employees"]), "--questions", str(options["questions"])],
+                env=env, check=True,
+            )
+
+            log_path = os.path.join(tmp, "gunicorn.log")
+            with open(log_path, "w") as log:
+                server = subprocess.Popen(
+                    [sys.executable, "-m", "gunicorn", "project1.wsgi"],
+                    cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+                )
+            try:
+                _wait_until_ready(port, server)
+                stats, elapsed = self.run_sessions(port, options)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            with open(log_path) as log:
+                failures = _failures(log.read())
+
+        self.report(stats, failures, elapsed, options)
+
+    def seed(self, options):
+        from django.contrib.auth.models import User
+        from app1.models import Department, Employee, HRProfile
+        from app1 import checklists
+
+        hr = User.objects.create_user(username="loadtest-hr", password=PASSWORD, is_staff=True)
+        HRProfile.objects.create(user=hr)
+        departments = [
+            Department.objects.create(
+                name=f"Dept {i}", email=f"dept{i}@loadtest.local", password=PASSWORD, is_assigned_department=True
+            )
+            for i in range(options["departments"])
+        ]
+        employees = [
+            Employee.objects.create(
+                employee_name=f"Employee {i}", employee_id=f"LT{i}", designation="Staff",
+                employee_department=departments[i % len(departments)].name,
+                last_work_date=date.today(), type_of_separation="resignation",
+            )
+            for i in range(options["employees"])
+        ]
+        checklists.assign([employee.pk for employee in employees], [department.pk for department in departments])
+        for department in departments:
+            checklists.create_questions(
+                department,
+                [{"text": f"Item {i}", "is_concerned_question": i == 0} for i in range(options["questions"])],
+            )
+
+    def run_sessions(self, port, options):
+        stats = defaultdict(lambda: {"latencies": [], "statuses": Counter()})
+        lock = threading.Lock()
+        deadline = time.monotonic() + options["duration"]
+        think = options["think"] / 1000
+
+        def session(script, *args):
+            client = _Client(port, stats, lock)
+            try:
+                script(client, deadline, think, *args)
+            finally:
+                client.close()
+
+        sessions = [(department_session, i) for i in range(options["departments"])]
+        sessions += [(hr_session,) for _ in range(options["hr_sessions"])]
+        start = time.monotonic()
+        with ThreadPoolExecutor(len(sessions)) as pool:
+            for future in [pool.submit(session, *s) for s in sessions]:
+                future.result()
+        return stats, time.monotonic() - start
+
+    def report(self, stats, failures, elapsed, options):
+        self.stdout.write(
+            f"{options['departments']} department + {options['hr_sessions']} HR sessions on "
+            f"{options['employees']} shared employees, {options['workers']} {options['profile']} workers, {elapsed:.1f} s"
+        )
+        self.stdout.write(
+            f"{'endpoint':<42}{'requests':>9}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}"
+            f"{'409':>6}{'4xx':>6}{'5xx':>6}{'locked':>8}{'deadlock':>10}"
+        )
+        totals = Counter()
+        for endpoint in sorted(stats):
+            latencies = sorted(stats[endpoint]["latencies"])
+            statuses = stats[endpoint]["statuses"]
+            conflicts = statuses[409]
+            client_errors = sum(n for code, n in statuses.items() if 400 <= code < 500) - conflicts
+            server_errors = sum(n for code, n in statuses.items() if code >= 500 or code == 0)
+            locked, deadlocks = failures[endpoint]["locked"], failures[endpoint]["deadlock"]
+            self.stdout.write(
+                f"{endpoint:<42}{len(latencies):>9}{len(latencies) / elapsed:>8.1f}"
+                f"{_percentile(latencies, 0.5):>9.1f}{_percentile(latencies, 0.99):>9.1f}"
+                f"{conflicts:>6}{client_errors:>6}{server_errors:>6}{locked:>8}{deadlocks:>10}"
+            )
+            totals.update(requests=len(latencies), conflicts=conflicts, server_errors=server_errors,
+                          locked=locked, deadlocks=deadlocks)
+        self.stdout.write(
+            f"total: {totals['requests']} requests, {totals['requests'] / elapsed:.1f} req/s, "
+            f"{totals['conflicts']} conflicts, {totals['server_errors']} server errors "
+            f"({totals['locked']} lock errors, {totals['deadlocks']} deadlocks)"
+        )
+        if not totals["requests"]:
+            raise CommandError("No request completed; see the gunicorn log output above.")
+
+
+class _Client:
+    """One keep-alive connection per session, timing every request by endpoint."""
+
+    def __init__(self, port, stats, lock):
+        self.port = port
+        self.stats = stats
+        self.lock = lock
+        self.token = None
+        self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def request(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Token {self.token}"
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = self.connection.getresponse()
+            status, data = response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()  # reconnects on the next request
+            status, data = 0, b""
+        elapsed = (time.perf_counter() - start) * 1000
+        with self.lock:
+            entry = self.stats[f"{method} {_endpoint(path)}"]
+            entry["latencies"].append(elapsed)
+            entry["statuses"][status] += 1
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        self.connection.close()
+
+
+def department_session(client, deadline, think, index):
+    status, body = client.request("POST", "/departments/login/", {"email": f"dept{index}@loadtest.local", "password": PASSWORD})
+    if status != 200:
+        return
+    client.token, department_id = body["token"], body["department_id"]
+    while time.monotonic() < deadline:
+        status, employees = client.request("GET", f"/employees/?department={department_id}")
+        if status != 200 or not employees:
+            continue
+        employee = random.choice(employees)
+        time.sleep(think)
+        status, checklist = client.request("GET", f"/questions/for_employee/?department={department_id}&employee={employee['id']}")
+        if status != 200:
+            continue
+        for item in random.sample(checklist["questions"], min(3, len(checklist["questions"]))):
+            time.sleep(think)
+            client.request("PATCH", f"/responses/{item['response_id']}/", {"is_checked": random.random() < 0.7})
+        comment = checklist["department_comment_data"]
+        text = {"comment_text": f"checked at {time.time():.0f}", "department_head_id": f"H{department_id}"}
+        time.sleep(think)
+        if comment["comment_id"]:
+            client.request("PATCH", f"/department-comments/{comment['comment_id']}/", text)
+        else:
+            client.request("POST", "/department-comments/", {**text, "employee": employee["id"], "department": department_id})
+
+
+def hr_session(client, deadline, think):
+    status, body = client.request("POST", "/hr/login/", {"username": "loadtest-hr", "password": PASSWORD})
+    if status != 200:
+        return
+    client.token = body["token"]
+    employee_ids = []
+    while time.monotonic() < deadline:
+        client.request("GET", "/employees/summary/")
+        if not employee_ids:
+            status, employees = client.request("GET", "/employees/")
+            employee_ids = [employee["id"] for employee in employees or []]
+        if employee_ids:
+            time.sleep(think)
+            client.request("GET", f"/employees/{random.choice(employee_ids)}/responses/")
+        time.sleep(think)
+
+
+def _endpoint(path):
+    return re.sub(r"/\d+/", "/{id}/", path.split("?", 1)[0])
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _failures(log):
+    """Lock errors and deadlocks per endpoint, from the tracebacks Django logged."""
+    failures = defaultdict(Counter)
+    for entry in re.split(r"(?=Internal Server Error: )", log)[1:]:
+        path = re.match(r"Internal Server Error: (\S+)", entry).group(1)
+        endpoint = f"{_method(path)} {_endpoint(path)}"  # Django logs the path only
+        lowered = entry.lower()
+        if any(marker in lowered for marker in DEADLOCKS):
+            failures[endpoint]["deadlock"] += 1
+        elif any(marker in lowered for marker in LOCK_ERRORS):
+            failures[endpoint]["locked"] += 1
+    return failures
+
+
+def _method(path):
+    """The method the sessions use on ``path``."""
+    if re.match(r"/(responses|department-comments)/\d+/", path):
+        return "PATCH"
+    if path.rstrip("/").endswith(("login", "department-comments")):
+        return "POST"
+    return "GET"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError("gunicorn exited during startup.")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/ready/")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise CommandError("gunicorn did not become ready in time.")
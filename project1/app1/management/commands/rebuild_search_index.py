@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app1 import search
+
+
+class Command(BaseCommand):
+    help = "Regenerate employee search documents and resynchronize the full-text index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} employees."))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app1.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (bulk assignments and the like), oldest first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10, help="Jobs run per poll.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting after one run.")
+        parser.add_argument("--interval", type=int, default=5, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_pending(limit=options["limit"])
+            if ran or not options["loop"]:
+                self.stdout.write(f"Ran {ran} jobs.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
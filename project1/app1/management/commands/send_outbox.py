@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app1.notifications import send_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver pending department notifications from the outbox as per-department digests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500, help="Messages claimed per run.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting after one run.")
+        parser.add_argument("--interval", type=int, default=30, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending(limit=options["limit"])
+            if sent or failed or not options["loop"]:
+                self.stdout.write(f"Sent {sent} messages, {failed} will be retried or have failed.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,119 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a scratch SQLite database with concurrent checkbox PATCHes from several processes, "
+        "with and without the SQLite profile, and report throughput and error rate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=100, help="PATCHes per worker.")
+        parser.add_argument("--employees", type=int, default=5, help="Employees shared by all workers.")
+        parser.add_argument("--profile", choices=["off", "on", "both"], default="both")
+        # Internal: the roles a child process plays.
+        parser.add_argument("--seed", action="store_true", help="(internal) seed the scratch database.")
+        parser.add_argument("--worker", action="store_true", help="(internal) run one worker.")
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            return self.seed(options["employees"])
+        if options["worker"]:
+            return self.work(options["requests"])
+
+        profiles = ["off", "on"] if options["profile"] == "both" else [options["profile"]]
+        self.stdout.write(f"{options['workers']} workers x {options['requests']} PATCHes on {options['employees']} shared employees")
+        self.stdout.write(f"{'profile':<9}{'ok':>7}{'errors':>8}{'error rate':>12}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile in profiles:
+                self.run_profile(profile, os.path.join(tmp, f"stress-{profile}.sqlite3"), options)
+
+    def run_profile(self, profile, path, options):
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "SQLITE_PROFILE": profile, "DJANGO_DEBUG": "False"}
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+        subprocess.run(manage + ["migrate", "-v0"], env=env, check=True)
+        subprocess.run(manage + ["sqlite_stress", "--seed", "--employees", str(options["employees"])], env=env, check=True)
+
+        start = time.perf_counter()
+        workers = [
+            subprocess.Popen(
+                manage + ["sqlite_stress", "--worker", "--requests", str(options["requests"])],
+                env=env, stdout=subprocess.PIPE, text=True,
+            )
+            for _ in range(options["workers"])
+        ]
+        results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+        elapsed = time.perf_counter() - start
+
+        ok = sum(r["ok"] for r in results)
+        errors = sum(r["errors"] for r in results)
+        latencies = sorted(latency for r in results for latency in r["latencies"])
+        p50 = latencies[len(latencies) // 2] if latencies else 0
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        self.stdout.write(
+            f"{profile:<9}{ok:>7}{errors:>8}{errors / max(ok + errors, 1):>11.1%}"
+            f"{ok / elapsed:>9.1f}{p50 * 1000:>9.1f}{p99 * 1000:>9.1f}"
+        )
+
+    def seed(self, employee_count):
+        from app1.models import Department, Employee, Question, EmployeeQuestionResponse, DepartmentEmployeeComment
+
+        departments = [
+            Department.objects.create(name=f"Dept {i}", email=f"dept{i}@example.com", password="x", is_assigned_department=True)
+            for i in range(3)
+        ]
+        for dept in departments:
+            Question.objects.bulk_create([Question(department=dept, text=f"Item {i}") for i in range(5)])
+        for i in range(employee_count):
+            employee = Employee.objects.create(
+                employee_name=f"Employee {i}", employee_id=f"S{i}", designation="Staff",
+                last_work_date=date.today(), type_of_separation="resignation",
+            )
+            employee.assigned_departments.set(departments)
+            for dept in departments:
+                EmployeeQuestionResponse.objects.bulk_create([
+                    EmployeeQuestionResponse(employee=employee, department=dept, question=q) for q in dept.questions.all()
+                ])
+                DepartmentEmployeeComment.objects.create(employee=employee, department=dept)
+
+    def work(self, count):
+        from django.test import Client
+        from rest_framework.authtoken.models import Token
+        from app1.models import EmployeeQuestionResponse
+
+        tokens = {int(t.user.username.split("_")[1]): t.key for t in Token.objects.select_related("user")}
+        responses = list(EmployeeQuestionResponse.objects.values_list("id", "department_id"))
+        client = Client()
+        ok = errors = 0
+        latencies = []
+        for _ in range(count):
+            response_id, department_id = random.choice(responses)
+            start = time.perf_counter()
+            try:
+                result = client.patch(
+                    f"/responses/{response_id}/",
+                    data=json.dumps({"is_checked": random.random() < 0.5}),
+                    content_type="application/json",
+                    HTTP_AUTHORIZATION=f"Token {tokens[department_id]}",
+                )
+                succeeded = result.status_code < 400
+            except OperationalError:  # "database is locked"
+                succeeded = False
+            if succeeded:
+                ok += 1
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        self.stdout.write(json.dumps({"ok": ok, "errors": errors, "latencies": latencies}))
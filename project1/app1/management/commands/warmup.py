@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app1 import warmup
+
+# First requests timed by --measure, as a client opening the app would send them.
+PATHS = ("/ready/", "/departments/", "/employees/", "/employees/summary/", "/questions/")
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the worker warm-up stages and print their timings. With --measure, start fresh "
+        "processes with and without warm-up and compare the latency of their first requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--measure", action="store_true")
+        parser.add_argument("--user", help="Username whose token --measure sends (default: first staff user with a token).")
+        parser.add_argument("--cold", action="store_true", help="(internal) measure one process.")
+        parser.add_argument("--warm", action="store_true", help="(internal) measure one process.")
+        parser.add_argument("--launched", type=float, help="(internal) time.time() when the process was started.")
+
+    def handle(self, *args, **options):
+        if options["cold"] or options["warm"]:
+            return self.measure_process(options["warm"], options["user"], options["launched"])
+        if options["measure"]:
+            return self.measure(options["user"])
+
+        for stage, seconds in warmup.run().items():
+            self.stdout.write(f"{stage:<12}{seconds * 1000:>9.1f} ms")
+
+    def measure(self, user):
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py"), "warmup"]
+        if user:
+            manage += ["--user", user]
+        results = {}
+        for mode in ("cold", "warm"):
+            command = manage + [f"--{mode}", "--launched", repr(time.time())]
+            output = subprocess.run(command, env=os.environ, check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+        self.stdout.write(f"{'':<28}{'cold ms':>10}{'warm ms':>10}")
+        for name in ["startup", "warmup"] + [f"first {path}" for path in PATHS] + ["first requests total"]:
+            cold, warm = results["cold"].get(name, 0), results["warm"].get(name, 0)
+            self.stdout.write(f"{name:<28}{cold:>10.1f}{warm:>10.1f}")
+        self.stdout.write(f"{'second requests total':<28}{results['cold']['second requests total']:>10.1f}"
+                          f"{results['warm']['second requests total']:>10.1f}")
+
+    def measure_process(self, warm, username, launched):
+        # Interpreter start and django.setup() are done by now; what remains is
+        # the work a worker does on its first requests, which warm-up moves earlier.
+        result = {"startup": (time.time() - launched) * 1000}
+        from django.test import Client
+        from rest_framework.authtoken.models import Token
+
+        if warm:
+            start = time.perf_counter()
+            warmup.run()
+            result["warmup"] = (time.perf_counter() - start) * 1000
+
+        tokens = Token.objects.select_related("user")
+        token = tokens.filter(user__username=username).first() if username else tokens.filter(user__is_staff=True).first()
+        headers = {"HTTP_AUTHORIZATION": f"Token {token.key}"} if token else {}
+        client = Client()
+        for label in ("first", "second"):
+            total = 0.0
+            for path in PATHS:
+                start = time.perf_counter()
+                client.get(path, **headers)
+                elapsed = (time.perf_counter() - start) * 1000
+                total += elapsed
+                if label == "first":
+                    result[f"first {path}"] = elapsed
+            result[f"{label} requests total"] = total
+        self.stdout.write(json.dumps(result))
+
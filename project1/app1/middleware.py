@@ -0,0 +1,45 @@
+from . import changefeed, profiling
+
+
+class ChangeFeedMiddleware:
+    """
+    Run writes in one transaction and record their change-log entries with
+    a single insert at the end of it.
+    """
+    UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+    # POSTs that log nothing; not worth a (on SQLite, write-locking) transaction.
+    EXEMPT_PATHS = ("/hr/login/", "/departments/login/")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in self.UNSAFE_METHODS or request.path_info in self.EXEMPT_PATHS:
+            return self.get_response(request)
+        with changefeed.batch():
+            return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests from staff that ask for it (see ``profiling.py``);
+    everything else goes straight through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.requested(request) or not profiling.allowed(request):
+            return self.get_response(request)
+        if not profiling.acquire():
+            response = self.get_response(request)
+            response["X-Profile-Id"] = "busy"
+            return response
+        try:
+            with profiling.Profile() as profile:
+                response = self.get_response(request)
+            response["X-Profile-Id"] = profiling.save(profile, request, response)
+        finally:
+            profiling.release()
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0008_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEmployee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_pk', models.BigIntegerField(unique=True)),
+                ('employee_id', models.CharField(db_index=True, max_length=50)),
+                ('employee_name', models.CharField(max_length=100)),
+                ('employee_department', models.CharField(blank=True, max_length=100, null=True)),
+                ('type_of_separation', models.CharField(choices=[('resignation', 'Resignation'), ('termination', 'Termination'), ('retirement', 'Retirement'), ('other', 'Other')], max_length=20)),
+                ('last_work_date', models.DateField(db_index=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('snapshot', models.JSONField()),
+                ('assigned_departments', models.ManyToManyField(blank=True, related_name='archived_employees', to='app1.department')),
+            ],
+        ),
+    ]
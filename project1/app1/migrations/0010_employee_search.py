@@ -0,0 +1,83 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        # External-content FTS5 table kept in sync with the documents by triggers.
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE app1_employee_fts USING fts5("
+            "document, content='app1_employeesearchdocument', content_rowid='employee_id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER app1_employee_fts_ai AFTER INSERT ON app1_employeesearchdocument BEGIN "
+            "INSERT INTO app1_employee_fts(rowid, document) VALUES (new.employee_id, new.document); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER app1_employee_fts_ad AFTER DELETE ON app1_employeesearchdocument BEGIN "
+            "INSERT INTO app1_employee_fts(app1_employee_fts, rowid, document) VALUES ('delete', old.employee_id, old.document); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER app1_employee_fts_au AFTER UPDATE ON app1_employeesearchdocument BEGIN "
+            "INSERT INTO app1_employee_fts(app1_employee_fts, rowid, document) VALUES ('delete', old.employee_id, old.document); "
+            "INSERT INTO app1_employee_fts(rowid, document) VALUES (new.employee_id, new.document); END"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX app1_employeesearchdocument_tsv ON app1_employeesearchdocument "
+            "USING GIN (to_tsvector('simple', document))"
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for trigger in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS app1_employee_fts_{trigger}")
+        schema_editor.execute("DROP TABLE IF EXISTS app1_employee_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS app1_employeesearchdocument_tsv")
+
+
+def backfill_documents(apps, schema_editor):
+    Employee = apps.get_model("app1", "Employee")
+    DepartmentEmployeeComment = apps.get_model("app1", "DepartmentEmployeeComment")
+    EmployeeSearchDocument = apps.get_model("app1", "EmployeeSearchDocument")
+
+    # Same text as search.build_documents, so a later rebuild changes nothing.
+    comments = {}
+    for employee_id, text, head_id in DepartmentEmployeeComment.objects.order_by("id").values_list(
+        "employee_id", "comment_text", "department_head_id"
+    ):
+        comments.setdefault(employee_id, []).extend(part for part in (text, head_id) if part)
+    documents = [
+        EmployeeSearchDocument(
+            employee_id=pk,
+            document="\n".join(filter(None, [name, employee_id, designation, *comments.get(pk, [])])),
+        )
+        for pk, name, employee_id, designation in Employee.objects.values_list("id", "employee_name", "employee_id", "designation")
+    ]
+    EmployeeSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0009_archivedemployee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSearchDocument',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='app1.employee')),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
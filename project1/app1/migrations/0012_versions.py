@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0011_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departmentemployeecomment',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='employeequestionresponse',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
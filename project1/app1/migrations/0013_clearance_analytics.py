@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_created_at(apps, schema_editor):
+    # Checklist items are created when the employee is assigned, so the
+    # employee's creation time is the best estimate for existing rows.
+    Employee = apps.get_model("app1", "Employee")
+    EmployeeQuestionResponse = apps.get_model("app1", "EmployeeQuestionResponse")
+    EmployeeQuestionResponse.objects.update(
+        created_at=models.Subquery(Employee.objects.filter(pk=models.OuterRef("employee_id")).values("created_at")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0012_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeequestionresponse',
+            name='checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='employeequestionresponse',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ClearanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('type_of_separation', models.CharField(max_length=20)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clearance_rollups', to='app1.department')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='app1_cleara_day_078c20_idx')],
+                'unique_together': {('department', 'day', 'type_of_separation', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DepartmentClearance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_of_separation', models.CharField(max_length=20)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('completed_at', models.DateTimeField(db_index=True, null=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clearances', to='app1.department')),
+                ('employee', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='department_clearances', to='app1.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'department')},
+            },
+        ),
+    ]
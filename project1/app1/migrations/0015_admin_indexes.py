@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0014_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['status'], name='app1_employ_status_b6d9a0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['type_of_separation'], name='app1_employ_type_of_1cf252_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['last_work_date'], name='app1_employ_last_wo_db6cca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeequestionresponse',
+            index=models.Index(fields=['department', 'is_checked'], name='app1_employ_departm_25e841_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:36
+
+import binascii
+import os
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import migrations, models
+
+
+def provision_department_users(apps, schema_editor):
+    # Department.provision_user() for existing departments, adopting the
+    # "dept_<id>" users and tokens earlier logins created.
+    Department = apps.get_model("app1", "Department")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Token = apps.get_model("authtoken", "Token")
+    for department in Department.objects.filter(user__isnull=True):
+        user, _ = User.objects.get_or_create(username=f"dept_{department.pk}")
+        if not user.password.startswith("!"):  # departments log in with their own password
+            user.password = make_password(None)
+            user.save(update_fields=["password"])
+        department.user = user
+        department.save(update_fields=["user"])
+        if not Token.objects.filter(user=user).exists():
+            # The historical model lacks Token.save()'s key generation.
+            Token.objects.create(user=user, key=binascii.hexlify(os.urandom(20)).decode())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0015_admin_indexes'),
+        ('authtoken', '0003_tokenproxy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='user',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='department', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(provision_department_users, migrations.RunPython.noop),
+    ]
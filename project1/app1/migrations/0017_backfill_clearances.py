@@ -0,0 +1,100 @@
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+# analytics.BUCKET_BOUNDS_HOURS as of this migration; copied so that later
+# changes to the live module can't change what it does.
+BUCKET_BOUNDS_HOURS = (1, 2, 4, 8, 12, 24, 36, 48, 72, 96, 120, 168, 240, 336, 504, 720, 1080, 1440, 2160)
+
+
+def backfill_checked_at(apps, schema_editor):
+    # Items checked before 0013 have no checked_at. The department's comment
+    # is saved when it signs off, so its last update is the best estimate;
+    # rows without one fall back to when the item was created.
+    DepartmentEmployeeComment = apps.get_model("app1", "DepartmentEmployeeComment")
+    EmployeeQuestionResponse = apps.get_model("app1", "EmployeeQuestionResponse")
+    signed_off = DepartmentEmployeeComment.objects.filter(
+        employee_id=models.OuterRef("employee_id"), department_id=models.OuterRef("department_id")
+    ).values("updated_at")[:1]
+    EmployeeQuestionResponse.objects.filter(is_checked=True, checked_at__isnull=True).update(
+        checked_at=Greatest(Coalesce(models.Subquery(signed_off), "created_at"), "created_at")
+    )
+
+
+def backfill_clearances(apps, schema_editor):
+    # 0013 created the clearance tables empty; this is analytics.rebuild()
+    # on the historical models.
+    Employee = apps.get_model("app1", "Employee")
+    EmployeeQuestionResponse = apps.get_model("app1", "EmployeeQuestionResponse")
+    DepartmentClearance = apps.get_model("app1", "DepartmentClearance")
+    ClearanceRollup = apps.get_model("app1", "ClearanceRollup")
+
+    pairs = set(Employee.assigned_departments.through.objects.values_list("employee_id", "department_id"))
+    groups = (
+        EmployeeQuestionResponse.objects.values("employee_id", "department_id", "employee__type_of_separation")
+        .annotate(
+            started=models.Min("created_at"),
+            last_checked=models.Max("checked_at"),
+            unchecked=models.Count("id", filter=models.Q(is_checked=False)),
+        )
+        .order_by()
+    )
+    states = {
+        (row["employee_id"], row["department_id"]): (
+            row["employee__type_of_separation"],
+            row["started"],
+            row["last_checked"] if not row["unchecked"] else None,
+        )
+        for row in groups
+        if (row["employee_id"], row["department_id"]) in pairs
+    }
+
+    existing = {(c.employee_id, c.department_id): c for c in DepartmentClearance.objects.filter(employee__isnull=False)}
+    changed, created = [], []
+    for key, (separation, started, completed) in states.items():
+        clearance = existing.get(key)
+        if clearance is None:
+            created.append(DepartmentClearance(
+                employee_id=key[0], department_id=key[1],
+                type_of_separation=separation, started_at=started, completed_at=completed,
+            ))
+        else:
+            clearance.type_of_separation, clearance.started_at, clearance.completed_at = separation, started, completed
+            changed.append(clearance)
+    DepartmentClearance.objects.bulk_create(created, batch_size=500)
+    DepartmentClearance.objects.bulk_update(changed, ["type_of_separation", "started_at", "completed_at"], batch_size=500)
+
+    totals = defaultdict(lambda: [0, 0.0])
+    completed = DepartmentClearance.objects.filter(completed_at__isnull=False, started_at__isnull=False)
+    for clearance in completed.iterator(chunk_size=2000):
+        seconds = max((clearance.completed_at - clearance.started_at).total_seconds(), 0)
+        key = (
+            clearance.department_id, timezone.localdate(clearance.completed_at),
+            clearance.type_of_separation, bisect_right(BUCKET_BOUNDS_HOURS, seconds / 3600),
+        )
+        totals[key][0] += 1
+        totals[key][1] += seconds
+    ClearanceRollup.objects.all().delete()
+    ClearanceRollup.objects.bulk_create(
+        [
+            ClearanceRollup(department_id=department_id, day=day, type_of_separation=separation,
+                            bucket=bucket, count=count, total_seconds=seconds)
+            for (department_id, day, separation, bucket), (count, seconds) in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0016_department_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_checked_at, migrations.RunPython.noop),
+        migrations.RunPython(backfill_clearances, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import deferred
 
 class HRProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="hr_profile")
@@ -15,9 +18,26 @@ class Department(models.Model):
     password = models.CharField(max_length=128, blank=True, null=True)  # Department sets later
     created_at = models.DateTimeField(auto_now_add=True)
     is_assigned_department = models.BooleanField(default=False) # NEW: Added field
+    # The API principal ("dept_<id>") department tokens belong to, created with the department.
+    user = models.OneToOneField(
+        User, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="department"
+    )
 
     def __str__(self):
         return self.name
+
+    def provision_user(self):
+        """Create (or adopt) the department's user and token, once."""
+        from rest_framework.authtoken.models import Token
+
+        if self.user_id is None:
+            user, created = User.objects.get_or_create(username=f"dept_{self.pk}")
+            if created or user.has_usable_password():
+                user.set_unusable_password()  # departments log in with their own password
+                user.save(update_fields=["password"])
+            Department.objects.filter(pk=self.pk).update(user=user)
+            self.user = user
+        Token.objects.get_or_create(user_id=self.user_id)
     
 
 class Employee(models.Model):
@@ -43,12 +63,24 @@ class Employee(models.Model):
     type_of_separation = models.CharField(max_length=20, choices=SEPARATION_CHOICES)
     assigned_departments = models.ManyToManyField(Department, related_name="employees")
     created_at = models.DateTimeField(auto_now_add=True)
+    version = models.PositiveIntegerField(default=1)  # optimistic concurrency, see concurrency.py
+
+    class Meta:
+        # Back the admin's list filters and the bulk-assignment filters.
+        indexes = [
+            models.Index(fields=["status"]),
+            models.Index(fields=["type_of_separation"]),
+            models.Index(fields=["last_work_date"]),
+        ]
 
     def __str__(self):
         return self.employee_name
     
     def update_status(self):
         """Update HR global status based on department responses"""
+        if deferred.add("employee_status", [self.pk]):
+            return  # recomputed once when the surrounding batch ends
+
         depts = self.assigned_departments.all()
         done_depts = []
         for dept in depts:
@@ -58,15 +90,55 @@ class Employee(models.Model):
                 done_depts.append(dept.id)
 
         if not done_depts:
-            self.status = "pending"
+            status = "pending"
         elif len(done_depts) < depts.count():
-            self.status = "inprogress"
+            status = "inprogress"
         else:
-            self.status = "done"
+            status = "done"
 
-        self.save()
+        # Write only the derived column, so a recompute never overwrites
+        # fields another request changed, and leave the version alone.
+        if status != self.status:
+            self.status = status
+            self.save(update_fields=["status"])
     
 
+    @classmethod
+    def recompute_statuses(cls, ids):
+        """update_status() for many employees with two aggregate queries; only changed rows are saved."""
+        ids = set(ids)
+        assigned = {}
+        for employee_id, department_id in cls.assigned_departments.through.objects.filter(employee_id__in=ids).values_list(
+            "employee_id", "department_id"
+        ):
+            assigned.setdefault(employee_id, set()).add(department_id)
+        done = {}
+        open_items = (
+            EmployeeQuestionResponse.objects.filter(employee_id__in=ids)
+            .values("employee_id", "department_id")
+            .annotate(unchecked=models.Count("id", filter=models.Q(is_checked=False)))
+            .order_by()
+        )
+        for row in open_items:
+            if not row["unchecked"] and row["department_id"] in assigned.get(row["employee_id"], ()):
+                done[row["employee_id"]] = done.get(row["employee_id"], 0) + 1
+
+        for employee in cls.objects.filter(pk__in=ids).only("id", "status"):
+            done_count = done.get(employee.pk, 0)
+            if not done_count:
+                status = "pending"
+            elif done_count < len(assigned.get(employee.pk, ())):
+                status = "inprogress"
+            else:
+                status = "done"
+            if status != employee.status:
+                employee.status = status
+                employee.save(update_fields=["status"])
+
+
+deferred.register("employee_status", lambda ids: Employee.recompute_statuses(ids))
+
+
 class Question(models.Model):
     department = models.ForeignKey(
         "Department", on_delete=models.CASCADE, related_name="questions"
@@ -88,9 +160,23 @@ class EmployeeQuestionResponse(models.Model):
     )
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     is_checked = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    checked_at = models.DateTimeField(null=True, blank=True)  # when is_checked last became True
 
     class Meta:
         unique_together = ("employee", "department", "question")
+        indexes = [models.Index(fields=["department", "is_checked"])]
+
+    def save(self, *args, **kwargs):
+        if not self.is_checked:
+            self.checked_at = None
+        elif self.checked_at is None:
+            self.checked_at = timezone.now()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "is_checked" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "checked_at"}
+        super().save(*args, **kwargs)
 
 
 class DepartmentEmployeeComment(models.Model):
@@ -105,9 +191,158 @@ class DepartmentEmployeeComment(models.Model):
     department_head_id = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
 
     class Meta:
         unique_together = ("employee", "department") # Each department can only add one comment per employee
 
     def __str__(self):
-        return f"Comment from {self.department.name} for {self.employee.employee_name}"
\ No newline at end of file
+        return f"Comment from {self.department.name} for {self.employee.employee_name}"
+
+class ChangeLogEntry(models.Model):
+    """Append-only log behind the ``changes`` delta-sync endpoint."""
+    ACTION_CHOICES = [
+        ("upsert", "Upsert"),
+        ("delete", "Delete"),
+    ]
+
+    model = models.CharField(max_length=50)  # router name, e.g. "employees"
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Department the change is visible to; NULL for employee rows, which are
+    # scoped through the employee's current assignments instead.
+    department_id = models.BigIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["department_id", "id"])]
+
+
+class ChangeLogHorizon(models.Model):
+    """Single row recording the highest entry id removed by retention."""
+    pruned_through = models.BigIntegerField(default=0)
+
+
+class ArchivedEmployee(models.Model):
+    """
+    Compact snapshot of a finished clearance, moved out of the live tables
+    by the ``archive_clearances`` command.
+    """
+    employee_pk = models.BigIntegerField(unique=True)  # id the employee had while live
+    employee_id = models.CharField(max_length=50, db_index=True)
+    employee_name = models.CharField(max_length=100)
+    employee_department = models.CharField(max_length=100, blank=True, null=True)
+    type_of_separation = models.CharField(max_length=20, choices=Employee.SEPARATION_CHOICES)
+    last_work_date = models.DateField(db_index=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    assigned_departments = models.ManyToManyField(Department, related_name="archived_employees", blank=True)
+    # {"employee": <employee list row>, "clearance": <responses payload>}
+    snapshot = models.JSONField()
+
+    def __str__(self):
+        return f"{self.employee_name} (archived)"
+
+
+class EmployeeSearchDocument(models.Model):
+    """
+    Denormalized text searched by ``employees/search``. The full-text index
+    over ``document`` is backend specific (SQLite FTS5 or a PostgreSQL GIN
+    index) and created in migration 0010.
+    """
+    employee = models.OneToOneField(
+        Employee, on_delete=models.CASCADE, primary_key=True, related_name="search_document"
+    )
+    document = models.TextField()
+
+
+class OutboxMessage(models.Model):
+    """
+    Department notification written in the same transaction as the change
+    that caused it and delivered later by the ``send_outbox`` command.
+    """
+    CHANNEL_CHOICES = [
+        ("email", "Email"),
+        ("webhook", "Webhook"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="outbox_messages")
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.channel} to {self.department_id}: {self.subject}"
+
+
+class DepartmentClearance(models.Model):
+    """
+    One department's part of an exit clearance: from its first checklist item
+    being created to its last one being checked. Kept when the employee is
+    archived, since the analytics rollups are rebuilt from these rows.
+    """
+    employee = models.ForeignKey(
+        Employee, on_delete=models.SET_NULL, null=True, related_name="department_clearances"
+    )
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="clearances")
+    type_of_separation = models.CharField(max_length=20)
+    started_at = models.DateTimeField(null=True)
+    completed_at = models.DateTimeField(null=True, db_index=True)
+
+    class Meta:
+        unique_together = ("employee", "department")
+
+
+class ClearanceRollup(models.Model):
+    """Histogram of time-to-clear per department, completion day and separation type."""
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="clearance_rollups")
+    day = models.DateField()
+    type_of_separation = models.CharField(max_length=20)
+    bucket = models.PositiveSmallIntegerField()  # index into analytics.BUCKET_BOUNDS_HOURS
+    count = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ("department", "day", "type_of_separation", "bucket")
+        indexes = [models.Index(fields=["day"])]
+
+
+class Job(models.Model):
+    """A long-running operation, run by the ``run_jobs`` command and polled at /jobs/<id>/."""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True)  # a runner that stops renewing it lost the job
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
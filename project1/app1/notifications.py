@@ -0,0 +1,128 @@
+"""
+Transactional outbox for department notifications.
+
+Views call :func:`notify_departments`, which only inserts OutboxMessage rows,
+so the notification commits or rolls back with the change that caused it
+and the request never waits on SMTP. :func:`send_pending` (run by the
+``send_outbox`` command) groups due messages per department and channel into
+one digest, delivers it, and reschedules failures with exponential backoff.
+"""
+import json
+import urllib.request
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+# How long a sender owns the messages it claimed before another may retry them.
+CLAIM_SECONDS = 300
+
+
+def notify_departments(departments, subject, body, payload=None):
+    messages = []
+    for dept in departments:
+        messages.append(OutboxMessage(department=dept, channel="email", subject=subject, body=body, payload=payload or {}))
+        if settings.OUTBOX_WEBHOOK_URL:
+            messages.append(OutboxMessage(department=dept, channel="webhook", subject=subject, body=body, payload=payload or {}))
+    OutboxMessage.objects.bulk_create(messages)
+
+
+def _claim(limit):
+    """Lease up to ``limit`` due messages to this sender."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        OutboxMessage.objects.filter(id__in=ids).update(next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS))
+    return list(
+        OutboxMessage.objects.filter(id__in=ids)
+        .select_related("department")
+        .order_by("department_id", "channel", "created_at")
+    )
+
+
+def _send_email(connection, department, messages):
+    if len(messages) == 1:
+        subject, body = messages[0].subject, messages[0].body
+    else:
+        subject = f"{len(messages)} clearance updates for {department.name}"
+        body = "\n\n".join(f"- {m.subject}\n{m.body}" for m in messages)
+    EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [department.email], connection=connection).send()
+
+
+def _send_webhook(department, messages):
+    data = json.dumps({
+        "department_id": department.id,
+        "department": department.name,
+        "messages": [
+            {"subject": m.subject, "body": m.body, "payload": m.payload, "created_at": m.created_at.isoformat()}
+            for m in messages
+        ],
+    }).encode()
+    request = urllib.request.Request(
+        settings.OUTBOX_WEBHOOK_URL, data=data, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        response.read()
+
+
+def send_pending(limit=500):
+    """Deliver due messages as per-department digests. Returns (sent, failed) message counts."""
+    messages = _claim(limit)
+    if not messages:
+        return 0, 0
+
+    sent = failed = 0
+    # One SMTP session for the whole run, opened by the first email digest. If
+    # it can't be opened, every email group of the run is rescheduled with
+    # that error instead of trying the server again.
+    connection = unavailable = None
+    try:
+        for (department_id, channel), group in groupby(messages, key=lambda m: (m.department_id, m.channel)):
+            group = list(group)
+            department = group[0].department
+            try:
+                if channel == "email":
+                    if connection is None and unavailable is None:
+                        try:
+                            connection = get_connection()
+                            connection.open()
+                        except Exception as exc:
+                            connection, unavailable = None, exc
+                    if unavailable is not None:
+                        raise unavailable
+                    _send_email(connection, department, group)
+                else:
+                    _send_webhook(department, group)
+            except Exception as exc:
+                _reschedule(group, exc)
+                failed += len(group)
+            else:
+                OutboxMessage.objects.filter(id__in=[m.id for m in group]).update(status="sent", sent_at=timezone.now())
+                sent += len(group)
+    finally:
+        if connection is not None:
+            connection.close()
+    return sent, failed
+
+
+def _reschedule(messages, error):
+    now = timezone.now()
+    for message in messages:
+        message.attempts += 1
+        message.last_error = f"{type(error).__name__}: {error}"[:1000]
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = "failed"
+        else:
+            delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (message.attempts - 1), 6 * 60 * 60)
+            message.next_attempt_at = now + timedelta(seconds=delay)
+    OutboxMessage.objects.bulk_update(messages, ["attempts", "last_error", "status", "next_attempt_at"])
@@ -0,0 +1,113 @@
+"""
+Cache for the rendered per-employee clearance payloads.
+
+Payloads are keyed by employee, department and the current version token of
+each. Versions are bumped by the signal receivers in ``signals.py`` once the
+writing transaction commits, so a stale payload is never looked up again and
+simply ages out of the size-bounded cache. The cache is shared by all worker
+processes (Redis, or a file cache on one host), so a bump made by one worker
+is seen by the others. Hit and miss counts are kept per process: the file
+cache has no atomic increment to share them with.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import deferred
+
+
+def _cache():
+    return caches[settings.PAYLOAD_CACHE_ALIAS]
+
+
+def _version_key(kind, pk):
+    return f"payload:v:{kind}:{pk}"
+
+
+def versions(kind, ids):
+    """Current version tokens for ``ids``, creating any that are missing."""
+    cache = _cache()
+    keys = {_version_key(kind, pk): pk for pk in ids}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        # A fresh token never matches a payload built under an evicted one.
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(kind, ids):
+    if ids:
+        token = time.time_ns()
+        _cache().set_many({_version_key(kind, pk): token for pk in ids}, timeout=None)
+
+
+def invalidate(kind, ids):
+    """Bump ``ids`` once the current transaction commits."""
+    ids = set(ids)
+    if not deferred.add(f"payload:{kind}", ids):
+        # Bumping before commit would let a concurrent reader cache
+        # pre-commit data under the new version.
+        transaction.on_commit(lambda: bump(kind, ids))
+
+
+for _kind in ("employee", "department"):
+    deferred.register(f"payload:{_kind}", lambda ids, kind=_kind: transaction.on_commit(lambda: bump(kind, ids)))
+
+
+def responses_key(employee, department_ids):
+    (employee_version,) = versions("employee", [employee.pk])
+    department_versions = versions("department", sorted(department_ids))
+    return f"payload:responses:{employee.pk}:{employee_version}:{'-'.join(map(str, department_versions))}"
+
+
+def for_employee_key(employee, department):
+    (employee_version,) = versions("employee", [employee.pk])
+    (department_version,) = versions("department", [department.pk])
+    return f"payload:for_employee:{employee.pk}:{department.pk}:{employee_version}:{department_version}"
+
+
+def get_or_build(key, build, done=False, count=True):
+    """
+    Return the cached payload for ``key``, building and storing it on a miss.
+    ``count=False`` keeps the lookup out of :func:`stats` (warm-up).
+    """
+    cache = _cache()
+    payload = cache.get(key)
+    if payload is not None:
+        if count:
+            _count("hits")
+        return payload
+    if count:
+        _count("misses")
+    payload = build()
+    timeout = settings.PAYLOAD_CACHE_DONE_TIMEOUT if done else settings.PAYLOAD_CACHE_TIMEOUT
+    cache.set(key, payload, timeout=timeout)
+    return payload
+
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    """This worker process's lookups since it started."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    lookups = hits + misses
+    return {
+        "pid": os.getpid(),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+    }
@@ -0,0 +1,284 @@
+"""
+On-demand request profiling.
+
+A staff user asks for it with an ``X-Profile: 1`` header or ``?__profile=1``.
+:class:`~app1.middleware.ProfilingMiddleware` then runs the request under
+pyinstrument when it is installed, otherwise cProfile, logs every SQL query
+with its duration, and :func:`save` writes the result to ``PROFILE_DIR``.
+Only the newest ``PROFILE_KEEP`` profiles are kept.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - optional
+    pyinstrument = None
+
+# Only one profiler can be attached to the interpreter at a time.
+_lock = threading.Lock()
+
+MAX_QUERIES = 2000
+
+# Modules whose functions make up the serializer breakdown.
+SERIALIZER_MODULES = (
+    os.path.join("app1", "serializers.py"),
+    os.path.join("app1", "rows.py"),
+    os.path.join("app1", "renderers.py"),
+    os.path.join("rest_framework", "serializers.py"),
+    os.path.join("rest_framework", "fields.py"),
+    os.path.join("rest_framework", "relations.py"),
+    os.path.join("rest_framework", "renderers.py"),
+)
+
+
+def requested(request):
+    return request.headers.get("X-Profile") == "1" or request.GET.get("__profile") == "1"
+
+
+def allowed(request):
+    """Whether the caller is staff, by session or by API token."""
+    user = request.user
+    if not user.is_authenticated:
+        try:
+            result = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        user = result[0] if result else user
+    return user.is_staff
+
+
+def acquire():
+    return _lock.acquire(blocking=False)
+
+
+def release():
+    _lock.release()
+
+
+class QueryLog:
+    """``execute_wrapper`` that records each query's SQL and duration, without its parameters."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    "alias": context["connection"].alias,
+                    "sql": sql,
+                    # Values are left out: they include token keys, password
+                    # hashes and personal data, and profiles are kept on disk.
+                    "param_count": len(params) if params is not None and not many else None,
+                    "many": many,
+                    "ms": round(duration * 1000, 3),
+                })
+
+
+class Profile:
+    """Profiles the code run inside ``with profile:``."""
+
+    def __init__(self):
+        self.queries = QueryLog()
+        self.profiler = None
+        self.elapsed = 0.0
+        self._stack = ExitStack()
+
+    @property
+    def kind(self):
+        return "pyinstrument" if pyinstrument is not None else "cprofile"
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self.queries))
+        self._start = time.perf_counter()
+        if pyinstrument is not None:
+            self.profiler = pyinstrument.Profiler()
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if pyinstrument is not None:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        self.elapsed = time.perf_counter() - self._start
+        self._stack.close()
+        return False
+
+    def _stats(self):
+        return pstats.Stats(self.profiler, stream=io.StringIO())
+
+    def top_functions(self, limit=40):
+        if pyinstrument is not None:
+            return self.profiler.output_text(unicode=True, color=False)
+        stats = self._stats()
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stats.stream.getvalue()
+
+    def serializer_breakdown(self, limit=25):
+        """Time spent in serializer, field and renderer code, by function."""
+        if pyinstrument is not None:
+            return self._pyinstrument_breakdown(limit)
+        rows = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in self._stats().stats.items():
+            if filename.endswith(SERIALIZER_MODULES):
+                rows.append({
+                    "function": f"{_short(filename)}:{line}({name})",
+                    "calls": calls,
+                    "own_ms": round(tottime * 1000, 3),
+                    "cumulative_ms": round(cumtime * 1000, 3),
+                })
+        rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+        return rows[:limit]
+
+    def _pyinstrument_breakdown(self, limit):
+        totals = {}
+        stack = [self.profiler.last_session.root_frame()]
+        while stack:
+            frame = stack.pop()
+            if frame is None:
+                continue
+            stack.extend(frame.children)
+            if frame.file_path and frame.file_path.endswith(SERIALIZER_MODULES):
+                label = f"{_short(frame.file_path)}:{frame.line_no}({frame.function})"
+                row = totals.setdefault(label, {"function": label, "own_ms": 0.0, "cumulative_ms": 0.0})
+                row["own_ms"] += frame.total_self_time * 1000
+                # Recursive frames would count twice; the outermost one already includes them.
+                if not _has_ancestor(frame, frame.file_path, frame.function):
+                    row["cumulative_ms"] += frame.time * 1000
+        rows = sorted(totals.values(), key=lambda row: row["cumulative_ms"], reverse=True)[:limit]
+        for row in rows:
+            row["own_ms"] = round(row["own_ms"], 3)
+            row["cumulative_ms"] = round(row["cumulative_ms"], 3)
+        return rows
+
+    def write_raw(self, path):
+        """Write the raw profile; returns the file name it was written under."""
+        if pyinstrument is not None:
+            path = f"{path}.html"
+            with open(path, "w") as handle:
+                handle.write(self.profiler.output_html())
+        else:
+            path = f"{path}.prof"
+            self._stats().dump_stats(path)
+        return os.path.basename(path)
+
+
+def _short(filename):
+    for marker in ("app1", "rest_framework", "django"):
+        index = filename.rfind(os.sep + marker + os.sep)
+        if index != -1:
+            return filename[index + 1:]
+    return filename
+
+
+def _has_ancestor(frame, file_path, function):
+    parent = frame.parent
+    while parent is not None:
+        if parent.file_path == file_path and parent.function == function:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _directory():
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def save(profile, request, response):
+    """Store ``profile`` and drop the oldest ones beyond ``PROFILE_KEEP``."""
+    directory = _directory()
+    # Ids sort by creation time, which is what the ring buffer evicts by.
+    profile_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+    raw_file = profile.write_raw(os.path.join(directory, profile_id))
+    queries = profile.queries
+    record = {
+        "id": profile_id,
+        "created_at": time.time(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "user": request.user.username if request.user.is_authenticated else None,
+        "status": response.status_code,
+        "profiler": profile.kind,
+        "raw_file": raw_file,
+        "elapsed_ms": round(profile.elapsed * 1000, 3),
+        "sql_count": queries.count,
+        "sql_ms": round(queries.total * 1000, 3),
+        "sql": queries.queries,
+        "serializers": profile.serializer_breakdown(),
+        "top_functions": profile.top_functions(),
+    }
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as handle:
+        json.dump(record, handle)
+    _prune(directory)
+    return profile_id
+
+
+def _prune(directory):
+    ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+    for profile_id in ids[:max(len(ids) - settings.PROFILE_KEEP, 0)]:
+        for name in os.listdir(directory):
+            if name.startswith(profile_id):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:  # another worker pruned it first
+                    pass
+
+
+SUMMARY_FIELDS = ("id", "created_at", "method", "path", "user", "status", "profiler", "elapsed_ms", "sql_count", "sql_ms")
+
+
+def list_profiles():
+    directory = _directory()
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".json"):
+            record = load(name[:-5])
+            if record is not None:
+                summaries.append({field: record.get(field) for field in SUMMARY_FIELDS})
+    return summaries
+
+
+def load(profile_id):
+    if not _valid_id(profile_id):
+        return None
+    try:
+        with open(os.path.join(_directory(), f"{profile_id}.json")) as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def raw_path(record):
+    return os.path.join(_directory(), record["raw_file"])
+
+
+def _valid_id(profile_id):
+    return all(c.isalnum() or c == "-" for c in profile_id) and bool(profile_id)
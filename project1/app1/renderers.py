@@ -0,0 +1,38 @@
+from rest_framework.renderers import JSONRenderer
+
+try:  # optional, much faster encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer.
+
+    Uses orjson when it is installed and produces exactly the same bytes as
+    the stock renderer (compact separators, raw UTF-8, escaped U+2028/U+2029,
+    DRF's date/decimal/lazy-string handling). Anything orjson can't match
+    byte-for-byte (indented output, ASCII-only output) goes through the
+    stdlib path of the parent class.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            # Types orjson refuses outright (e.g. ints wider than 64 bits).
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
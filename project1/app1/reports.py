@@ -0,0 +1,221 @@
+"""
+Month-end clearance reports.
+
+Everything for a month's finished exits is read in a handful of bulk
+queries, turned into plain per-employee documents, and rendered (an HTML
+certificate and a CSV of the checklist each) on a process pool, since the
+template rendering is CPU-bound. The results are streamed into a zip under
+``MEDIA_ROOT/reports`` together with a summary of the month.
+
+``manage.py clearance_reports`` runs it directly; ``POST /reports/clearances/``
+queues it as a ``clearance_reports`` job.
+"""
+import csv
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import jobs
+from .models import DepartmentClearance, DepartmentEmployeeComment, Employee, EmployeeQuestionResponse, Job
+
+REPORT_DIR = "reports"
+# Documents handed to a pool worker at a time, and between progress updates.
+CHUNK_SIZE = 25
+
+ITEM_COLUMNS = ["department", "item", "checked", "checked_at", "department_cleared_at", "department_comment", "department_head_id"]
+SUMMARY_COLUMNS = [
+    "employee_id", "employee_name", "designation", "employee_department",
+    "type_of_separation", "last_work_date", "cleared_at", "departments",
+]
+
+
+def parse_month(value):
+    """``"YYYY-MM"`` to ``(year, month)``; raises ValueError otherwise."""
+    # Anything but a string (a JSON number, say) is just as malformed.
+    match = re.fullmatch(r"(\d{4})-(\d{2})", value) if isinstance(value, str) else None
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError("month must be YYYY-MM")
+    return int(match.group(1)), int(match.group(2))
+
+
+def month_bounds(year, month):
+    start = timezone.make_aware(datetime(year, month, 1))
+    end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    return start, end
+
+
+def finished_in(year, month):
+    """Completed clearances whose last department cleared in the month."""
+    start, end = month_bounds(year, month)
+    return (
+        Employee.objects.filter(status="done")
+        .annotate(cleared_at=Max("department_clearances__completed_at"))
+        .filter(cleared_at__gte=start, cleared_at__lt=end)
+    )
+
+
+def load(year, month):
+    """The month's documents, one per employee, from five queries."""
+    employees = finished_in(year, month)
+    ids = employees.values("id")
+    documents = {
+        row["id"]: {**row, "departments": {}}
+        for row in employees.order_by("employee_id").values(
+            "id", "employee_id", "employee_name", "designation", "employee_department",
+            "type_of_separation", "last_work_date", "cleared_at",
+        )
+    }
+
+    def department(employee_id, department_id, name=None):
+        return documents[employee_id]["departments"].setdefault(
+            department_id,
+            {"name": name, "items": [], "comment": "", "department_head_id": "", "cleared_at": None},
+        )
+
+    assignments = Employee.assigned_departments.through.objects.filter(employee_id__in=ids)
+    for employee_id, department_id, name in assignments.values_list("employee_id", "department_id", "department__name"):
+        department(employee_id, department_id, name)
+
+    responses = (
+        EmployeeQuestionResponse.objects.filter(employee_id__in=ids)
+        .order_by("department_id", "question__is_concerned_question", "question_id")
+        .values_list("employee_id", "department_id", "question__text", "is_checked", "checked_at")
+    )
+    for employee_id, department_id, text, is_checked, checked_at in responses:
+        department(employee_id, department_id)["items"].append(
+            {"text": text, "is_checked": is_checked, "checked_at": checked_at}
+        )
+
+    comments = DepartmentEmployeeComment.objects.filter(employee_id__in=ids).values_list(
+        "employee_id", "department_id", "comment_text", "department_head_id"
+    )
+    for employee_id, department_id, text, head in comments:
+        entry = department(employee_id, department_id)
+        entry["comment"], entry["department_head_id"] = text or "", head or ""
+
+    clearances = DepartmentClearance.objects.filter(employee_id__in=ids).values_list(
+        "employee_id", "department_id", "completed_at"
+    )
+    for employee_id, department_id, completed_at in clearances:
+        if department_id in documents[employee_id]["departments"]:
+            documents[employee_id]["departments"][department_id]["cleared_at"] = completed_at
+
+    for document in documents.values():
+        # Only departments still assigned have a name; answers kept from an
+        # earlier assignment are not part of the clearance.
+        document["departments"] = sorted(
+            (entry for entry in document["departments"].values() if entry["name"]), key=lambda entry: entry["name"]
+        )
+    return list(documents.values())
+
+
+def filename(document):
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{document['employee_id']}-{document['employee_name']}").strip("-")
+    return slug or str(document["id"])
+
+
+def render(document):
+    """``(name, html, csv)`` for one employee. Runs in the pool workers."""
+    html = render_to_string("app1/reports/clearance.html", {"employee": document, "generated_at": timezone.now()})
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(ITEM_COLUMNS)
+    for entry in document["departments"]:
+        for item in entry["items"] or [{"text": "", "is_checked": "", "checked_at": None}]:
+            writer.writerow([
+                entry["name"], item["text"], item["is_checked"], _iso(item["checked_at"]),
+                _iso(entry["cleared_at"]), entry["comment"], entry["department_head_id"],
+            ])
+    return filename(document), html, out.getvalue()
+
+
+def render_chunk(documents):
+    return [render(document) for document in documents]
+
+
+def _init_worker():
+    # Forked workers inherit the configured project; spawned ones set it up.
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _iso(value):
+    return value.isoformat() if value else ""
+
+
+def default_path(year, month):
+    return os.path.join(settings.MEDIA_ROOT, REPORT_DIR, f"clearances-{year}-{month:02d}.zip")
+
+
+def generate(year, month, path=None, workers=None, progress=None):
+    """
+    Write the month's reports to ``path`` (see :func:`default_path`) and
+    return ``{"file", "employees"}``. ``progress(rendered, total)`` is called
+    after each chunk.
+    """
+    documents = load(year, month)
+    path = path or default_path(year, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    folder = f"clearances-{year}-{month:02d}"
+    chunks = [documents[start:start + CHUNK_SIZE] for start in range(0, len(documents), CHUNK_SIZE)]
+    workers = max(1, min(workers or settings.REPORT_WORKERS or os.cpu_count() or 1, len(chunks) or 1))
+
+    # Workers only render; don't hand them this process's connections.
+    connections.close_all()
+    partial = f"{path}.partial"
+    with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED) as archive:
+        rendered = 0
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            for results in pool.map(render_chunk, chunks):
+                for name, html, text in results:
+                    archive.writestr(f"{folder}/{name}.html", html)
+                    archive.writestr(f"{folder}/{name}.csv", text)
+                rendered += len(results)
+                if progress:
+                    progress(rendered, len(documents))
+
+        summary = {"year": year, "month": month, "employees": documents, "generated_at": timezone.now()}
+        archive.writestr(f"{folder}/summary.html", render_to_string("app1/reports/summary.html", summary))
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(SUMMARY_COLUMNS)
+        for document in documents:
+            writer.writerow([
+                document["employee_id"], document["employee_name"], document["designation"],
+                document["employee_department"] or "", document["type_of_separation"],
+                _iso(document["last_work_date"]), _iso(document["cleared_at"]),
+                "; ".join(entry["name"] for entry in document["departments"]),
+            ])
+        archive.writestr(f"{folder}/summary.csv", out.getvalue())
+    os.replace(partial, path)  # a half-written zip is never served
+    return {"file": os.path.relpath(path, settings.MEDIA_ROOT), "employees": len(documents)}
+
+
+def _report_job(job, progress):
+    # Rendering isn't resumable chunk by chunk; a retried job starts over
+    # and replaces the same file.
+    year, month = job.params["year"], job.params["month"]
+    path = os.path.join(settings.MEDIA_ROOT, REPORT_DIR, f"clearances-{year}-{month:02d}-job{job.pk}.zip")
+
+    def report(rendered, total):
+        if total != job.total:
+            job.total = total
+            Job.objects.filter(pk=job.pk).update(total=total)
+        progress(rendered)
+
+    return generate(year, month, path=path, progress=report)
+
+
+jobs.register("clearance_reports", _report_job)
@@ -0,0 +1,133 @@
+"""
+values()-based serialization for the hot list endpoints.
+
+Each builder takes a queryset and returns plain dicts with exactly the keys,
+order and value formatting of the matching ModelSerializer, so the rendered
+JSON is byte-for-byte identical. Related columns are pulled in with the same
+query instead of walking ``source='question.text'`` per object.
+"""
+from collections import defaultdict
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .models import Employee, DepartmentEmployeeComment
+
+# Reuse DRF's own fields so date/time formatting follows the API settings.
+_datetime = serializers.DateTimeField()
+_date = serializers.DateField()
+
+
+def _format_datetime(value):
+    return None if value is None else _datetime.to_representation(value)
+
+
+def _format_date(value):
+    return None if value is None else _date.to_representation(value)
+
+
+COMMENT_KEYS = ("id", "employee", "department", "department_name", "comment_text", "department_head_id", "created_at", "updated_at", "version")
+COMMENT_COLUMNS = ("id", "employee_id", "department_id", "department__name", "comment_text", "department_head_id", "created_at", "updated_at", "version")
+
+
+def _comment_row(values):
+    row = dict(zip(COMMENT_KEYS, values))
+    row["created_at"] = _format_datetime(row["created_at"])
+    row["updated_at"] = _format_datetime(row["updated_at"])
+    return row
+
+
+def comment_rows(queryset):
+    """Rows matching DepartmentEmployeeCommentSerializer."""
+    return [_comment_row(values) for values in queryset.values_list(*COMMENT_COLUMNS)]
+
+
+EMPLOYEE_KEYS = (
+    "id",
+    "employee_name",
+    "employee_id",
+    "employee_department",
+    "designation",
+    "status",
+    "progress",
+    "last_work_date",
+    "type_of_separation",
+    "created_at",
+    "version",
+)
+
+
+def employee_rows(queryset):
+    """Rows matching EmployeeSerializer, including nested comments."""
+    employees = list(queryset.values_list(*EMPLOYEE_KEYS))
+    if not employees:
+        return []
+
+    # Related rows are fetched with the employee query as a subquery, so the
+    # IN clause never grows with the number of employees. The orderings match
+    # what the related managers return per employee.
+    employee_ids = queryset.values("id")
+    departments = defaultdict(list)
+    through = Employee.assigned_departments.through
+    for employee_id, department_id in (
+        through.objects.filter(employee_id__in=employee_ids)
+        .order_by("employee_id", "department_id")
+        .values_list("employee_id", "department_id")
+    ):
+        departments[employee_id].append(department_id)
+
+    comments = defaultdict(list)
+    for values in (
+        DepartmentEmployeeComment.objects.filter(employee_id__in=employee_ids)
+        .order_by("employee_id", "id")
+        .values_list(*COMMENT_COLUMNS)
+    ):
+        comments[values[1]].append(_comment_row(values))
+
+    rows = []
+    for values in employees:
+        row = dict(zip(EMPLOYEE_KEYS, values))
+        pk = row["id"]
+        row["last_work_date"] = _format_date(row["last_work_date"])
+        created_at = row.pop("created_at")
+        version = row.pop("version")
+        row["assigned_departments"] = departments.get(pk, [])
+        row["created_at"] = _format_datetime(created_at)
+        row["department_comments"] = comments.get(pk, [])
+        row["version"] = version
+        rows.append(row)
+    return rows
+
+
+QUESTION_KEYS = ("id", "department", "department_name", "text", "is_concerned_question")
+
+
+def question_rows(queryset):
+    """Rows matching QuestionSerializer."""
+    columns = ("id", "department_id", "department__name", "text", "is_concerned_question")
+    return [dict(zip(QUESTION_KEYS, values)) for values in queryset.values_list(*columns)]
+
+
+RESPONSE_KEYS = ("id", "employee", "department", "question", "question_text", "is_checked", "version")
+
+
+def response_rows(queryset):
+    """Rows matching EmployeeQuestionResponseSerializer."""
+    columns = ("id", "employee_id", "department_id", "question_id", "question__text", "is_checked", "version")
+    return [dict(zip(RESPONSE_KEYS, values)) for values in queryset.values_list(*columns)]
+
+
+class RowListMixin:
+    """
+    Serve ``list`` from a ``rows`` builder instead of the model serializer.
+
+    ``row_builder`` must be a staticmethod. Paginated views fall back to the
+    regular serializer path.
+    """
+    row_builder = None
+
+    def list(self, request, *args, **kwargs):
+        if self.row_builder is None or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.row_builder(queryset))
@@ -0,0 +1,91 @@
+"""
+Full-text search over employees and their department comments.
+
+One EmployeeSearchDocument per employee holds the searchable text; the index
+over it is SQLite FTS5 or a PostgreSQL ``to_tsvector`` GIN index depending
+on the database (see migration 0010). Other backends fall back to
+``icontains`` matching.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Employee, DepartmentEmployeeComment, EmployeeSearchDocument
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def build_documents(employee_ids):
+    """Search text for each existing employee in ``employee_ids``."""
+    comments = {}
+    for employee_id, text, head_id in DepartmentEmployeeComment.objects.filter(
+        employee_id__in=employee_ids
+    ).order_by("id").values_list("employee_id", "comment_text", "department_head_id"):
+        comments.setdefault(employee_id, []).extend(part for part in (text, head_id) if part)
+
+    return {
+        pk: "\n".join(filter(None, [name, employee_id, designation, *comments.get(pk, [])]))
+        for pk, name, employee_id, designation in Employee.objects.filter(
+            id__in=employee_ids
+        ).values_list("id", "employee_name", "employee_id", "designation")
+    }
+
+
+def update_documents(employee_ids):
+    documents = build_documents(list(employee_ids))
+    if documents:
+        EmployeeSearchDocument.objects.bulk_create(
+            [EmployeeSearchDocument(employee_id=pk, document=text) for pk, text in documents.items()],
+            update_conflicts=True,
+            unique_fields=["employee"],
+            update_fields=["document"],
+        )
+
+
+def matching_employee_ids(query):
+    """
+    Subquery of employee ids whose document contains every term of ``query``
+    as a word prefix. Returns None when the query has no searchable terms.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return RawSQL("SELECT rowid FROM app1_employee_fts WHERE app1_employee_fts MATCH %s", [match])
+    if connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return RawSQL(
+            "SELECT employee_id FROM app1_employeesearchdocument "
+            "WHERE to_tsvector('simple', document) @@ to_tsquery('simple', %s)",
+            [tsquery],
+        )
+
+    documents = EmployeeSearchDocument.objects.all()
+    for term in terms:
+        documents = documents.filter(document__icontains=term)
+    return documents.values("employee_id")
+
+
+def search_employees(query, queryset=None):
+    queryset = Employee.objects.all() if queryset is None else queryset
+    ids = matching_employee_ids(query)
+    if ids is None:
+        return queryset.none()
+    return queryset.filter(id__in=ids)
+
+
+def rebuild(batch_size=500):
+    """Regenerate every document and resynchronize the full-text index."""
+    EmployeeSearchDocument.objects.exclude(employee__in=Employee.objects.all()).delete()
+    total = 0
+    ids = list(Employee.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(ids), batch_size):
+        update_documents(ids[start:start + batch_size])
+        total += len(ids[start:start + batch_size])
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO app1_employee_fts(app1_employee_fts) VALUES ('rebuild')")
+    return total
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import HRProfile, Department,Employee,Question, EmployeeQuestionResponse, DepartmentEmployeeComment
+from .models import HRProfile, Department,Employee,Question, EmployeeQuestionResponse, DepartmentEmployeeComment, Job
 
 
 class HRRegisterSerializer(serializers.ModelSerializer):
@@ -35,8 +35,8 @@ class DepartmentEmployeeCommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = DepartmentEmployeeComment
-        fields = ["id", "employee", "department", "department_name", "comment_text", "department_head_id", "created_at", "updated_at"]
-        read_only_fields = []
+        fields = ["id", "employee", "department", "department_name", "comment_text", "department_head_id", "created_at", "updated_at", "version"]
+        read_only_fields = ["version"]
 
 
 class EmployeeSerializer(serializers.ModelSerializer):
@@ -60,7 +60,9 @@ class EmployeeSerializer(serializers.ModelSerializer):
             "assigned_departments",
             "created_at",
             "department_comments",
+            "version",
         ]
+        read_only_fields = ["version"]
   
 # NEW: EmployeeCreateSerializer to filter assigned_departments queryset
 class EmployeeCreateSerializer(serializers.ModelSerializer):
@@ -86,7 +88,9 @@ class EmployeeCreateSerializer(serializers.ModelSerializer):
             "assigned_departments",
             "created_at",
             "department_comments",
+            "version",
         ]
+        read_only_fields = ["version"]
 
 
 class QuestionSerializer(serializers.ModelSerializer):
@@ -102,4 +106,14 @@ class EmployeeQuestionResponseSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = EmployeeQuestionResponse
-        fields = ["id", "employee", "department", "question", "question_text", "is_checked"]
\ No newline at end of file
+        fields = ["id", "employee", "department", "question", "question_text", "is_checked", "version"]
+        read_only_fields = ["version"]
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id", "kind", "status", "total", "processed", "result", "error",
+            "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
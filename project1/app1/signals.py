@@ -0,0 +1,148 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import analytics, changefeed, payload_cache, search
+from .models import Department, Employee, Question, EmployeeQuestionResponse, DepartmentEmployeeComment
+
+# Models tracked by the change feed, keyed to their router names.
+FEED_MODELS = {
+    Employee: "employees",
+    Question: "questions",
+    EmployeeQuestionResponse: "responses",
+    DepartmentEmployeeComment: "department-comments",
+}
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=EmployeeQuestionResponse)
+@receiver(post_save, sender=DepartmentEmployeeComment)
+def log_department_row_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changefeed.record(FEED_MODELS[sender], instance.pk, "upsert", instance.department_id)
+
+
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=EmployeeQuestionResponse)
+@receiver(post_delete, sender=DepartmentEmployeeComment)
+def log_department_row_deleted(sender, instance, **kwargs):
+    changefeed.record(FEED_MODELS[sender], instance.pk, "delete", instance.department_id)
+
+
+@receiver(post_save, sender=Employee)
+def log_employee_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changefeed.record("employees", instance.pk, "upsert")
+
+
+@receiver(pre_delete, sender=Employee)
+def remember_employee_departments(sender, instance, **kwargs):
+    # The M2M rows are gone by post_delete; keep them so every department
+    # that could see this employee is told about the delete.
+    instance._feed_department_ids = list(instance.assigned_departments.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Employee)
+def log_employee_deleted(sender, instance, **kwargs):
+    changefeed.record("employees", instance.pk, "delete")
+    for department_id in getattr(instance, "_feed_department_ids", []):
+        changefeed.record("employees", instance.pk, "delete", department_id)
+
+
+@receiver(m2m_changed, sender=Employee.assigned_departments.through)
+def log_assignment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        if reverse:
+            pairs = [(employee_id, instance.pk) for employee_id in instance.employees.values_list("id", flat=True)]
+        else:
+            pairs = [(instance.pk, department_id) for department_id in instance.assigned_departments.values_list("id", flat=True)]
+    elif action in ("post_add", "post_remove"):
+        if reverse:
+            pairs = [(employee_id, instance.pk) for employee_id in pk_set]
+        else:
+            pairs = [(instance.pk, department_id) for department_id in pk_set]
+    else:
+        return
+
+    for employee_id, department_id in pairs:
+        changefeed.record("employees", employee_id, "upsert")
+        if action != "post_add":
+            # A department that loses the employee sees it as a delete.
+            changefeed.record("employees", employee_id, "delete", department_id)
+
+
+@receiver(post_save, sender=EmployeeQuestionResponse)
+@receiver(post_delete, sender=EmployeeQuestionResponse)
+@receiver(post_save, sender=DepartmentEmployeeComment)
+@receiver(post_delete, sender=DepartmentEmployeeComment)
+def invalidate_employee_row_payloads(sender, instance, **kwargs):
+    payload_cache.invalidate("employee", [instance.employee_id])
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee_payloads(sender, instance, **kwargs):
+    payload_cache.invalidate("employee", [instance.pk])
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_payloads(sender, instance, **kwargs):
+    payload_cache.invalidate("department", [instance.department_id])
+
+
+@receiver(post_save, sender=Department)
+def invalidate_department_payloads(sender, instance, **kwargs):
+    payload_cache.invalidate("department", [instance.pk])
+
+
+@receiver(post_save, sender=Department)
+def provision_department_user(sender, instance, created, raw=False, **kwargs):
+    # Also on later saves (setting the password) of departments that lack one.
+    if not raw and (created or instance.user_id is None):
+        instance.provision_user()
+
+
+@receiver(m2m_changed, sender=Employee.assigned_departments.through)
+def invalidate_assignment_payloads(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        payload_cache.invalidate("employee", [instance.pk])
+    elif pk_set is not None:
+        payload_cache.invalidate("employee", pk_set)
+    else:
+        # department.employees.clear(): no ids left to bump individually.
+        payload_cache.invalidate("department", [instance.pk])
+
+
+@receiver(post_save, sender=Employee)
+def index_employee(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pk = instance.pk
+        transaction.on_commit(lambda: search.update_documents([pk]))
+
+
+@receiver(post_save, sender=DepartmentEmployeeComment)
+@receiver(post_delete, sender=DepartmentEmployeeComment)
+def index_comment_employee(sender, instance, raw=False, **kwargs):
+    # Deferred to commit so a cascade delete of the employee can't race a
+    # document write for it; update_documents skips missing employees.
+    if not raw:
+        employee_id = instance.employee_id
+        transaction.on_commit(lambda: search.update_documents([employee_id]))
+
+
+@receiver(post_save, sender=EmployeeQuestionResponse)
+@receiver(post_delete, sender=EmployeeQuestionResponse)
+def track_clearance(sender, instance, raw=False, **kwargs):
+    if not raw:
+        analytics.track([(instance.employee_id, instance.department_id)])
+
+
+@receiver(post_save, sender=Employee)
+def track_employee_clearances(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The rollups are keyed by separation type; status-only saves can't change it.
+    if not raw and (update_fields is None or "type_of_separation" in update_fields):
+        department_ids = instance.assigned_departments.values_list("id", flat=True)
+        analytics.track([(instance.pk, department_id) for department_id in department_ids])
@@ -1,3 +1,617 @@
-from django.test import TestCase
+import io
+import json
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from app1 import analytics, checklists, jobs, notifications, payload_cache, profiling, rows, search
+from app1.models import (
+    ArchivedEmployee, ChangeLogEntry, ChangeLogHorizon, Department, DepartmentClearance, DepartmentEmployeeComment,
+    Employee, EmployeeQuestionResponse, HRProfile, OutboxMessage, Question,
+)
+from app1.renderers import FastJSONRenderer
+from app1.serializers import (
+    DepartmentEmployeeCommentSerializer, EmployeeQuestionResponseSerializer, EmployeeSerializer, QuestionSerializer,
+)
+
+
+class ClearanceTestCase(APITestCase):
+    """Two departments with a regular and a concerned item each, and one employee leaving IT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = User.objects.create_user(username="hr", password="hr-password", is_staff=True)
+        HRProfile.objects.create(user=cls.hr)
+        cls.it = Department.objects.create(name="IT", email="it@example.com", password="it-password", is_assigned_department=True)
+        cls.finance = Department.objects.create(
+            name="Finance", email="finance@example.com", password="finance-password", is_assigned_department=True
+        )
+        for department in (cls.it, cls.finance):
+            Question.objects.create(department=department, text="Return equipment")
+            Question.objects.create(department=department, text="Hand over", is_concerned_question=True)
+        cls.employee = Employee.objects.create(
+            employee_name="Ann", employee_id="E1", employee_department="IT", designation="Developer",
+            last_work_date=date(2026, 1, 31), type_of_separation="resignation",
+        )
+        checklists.assign([cls.employee.pk], [cls.it.pk, cls.finance.pk])
+
+    def setUp(self):
+        # Payload versions and login counters live in the caches, not the test database.
+        for cache in caches.all():
+            cache.clear()
+
+    def as_hr(self):
+        token, _ = Token.objects.get_or_create(user=self.hr)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def as_department(self, department):
+        department.refresh_from_db()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {department.user.auth_token.key}")
+
+    def responses(self, department=None):
+        queryset = EmployeeQuestionResponse.objects.filter(employee=self.employee).order_by("id")
+        return queryset.filter(department=department) if department else queryset
+
+
+class RowBuilderTests(ClearanceTestCase):
+    """The values() row builders and FastJSONRenderer must serve the serializers' bytes."""
+
+    LISTS = (
+        ("/employees/", EmployeeSerializer, lambda: Employee.objects.order_by("-created_at")),
+        ("/questions/", QuestionSerializer, lambda: Question.objects.all()),
+        ("/responses/", EmployeeQuestionResponseSerializer, lambda: EmployeeQuestionResponse.objects.all()),
+        ("/department-comments/", DepartmentEmployeeCommentSerializer, lambda: DepartmentEmployeeComment.objects.all()),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Non-ASCII text, a line separator orjson would leave raw, a blank department.
+        Question.objects.create(department=cls.it, text="Rückgabe \u2028 Laptop — “Schlüssel”")
+        Employee.objects.create(
+            employee_name="Zoë", employee_id="E2", employee_department=None, designation="Analyst\u2029",
+            last_work_date=date(2026, 2, 28), type_of_separation="retirement",
+        )
+        comment = DepartmentEmployeeComment.objects.get(employee=cls.employee, department=cls.it)
+        comment.comment_text = "Badge returned ✓"
+        comment.department_head_id = "H-01"
+        comment.save()
+        EmployeeQuestionResponse.objects.filter(employee=cls.employee).update(is_checked=True)
+
+    def expected(self, serializer_class, queryset):
+        return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+    def test_list_endpoints_match_the_serializers_byte_for_byte(self):
+        self.as_hr()
+        for url, serializer_class, queryset in self.LISTS:
+            response = self.client.get(url, HTTP_ACCEPT="application/json")
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.content, self.expected(serializer_class, queryset()), url)
+
+    def test_row_builders_match_the_serializers(self):
+        builders = (rows.employee_rows, rows.question_rows, rows.response_rows, rows.comment_rows)
+        for (url, serializer_class, queryset), builder in zip(self.LISTS, builders):
+            self.assertEqual(
+                FastJSONRenderer().render(builder(queryset())), self.expected(serializer_class, queryset()), url
+            )
+
+    def test_stdlib_fallback_renders_the_same_bytes(self):
+        data = rows.employee_rows(Employee.objects.order_by("-created_at"))
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch("app1.renderers.orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+        # Integers orjson can't encode go through the parent class too.
+        self.assertEqual(FastJSONRenderer().render({"n": 2 ** 70}), b'{"n":1180591620717411303424}')
+
+
+class VersionConflictTests(ClearanceTestCase):
+    def test_stale_if_match_gets_409_with_the_current_row(self):
+        response = self.responses(self.it).first()
+        self.as_department(self.it)
+
+        first = self.client.patch(f"/responses/{response.pk}/", {"is_checked": True}, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["ETag"], '"2"')
+
+        stale = self.client.patch(f"/responses/{response.pk}/", {"is_checked": False}, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(stale.status_code, 409)
+        current = stale.json()["current"]
+        self.assertEqual(current["id"], response.pk)
+        self.assertIs(current["is_checked"], True)
+        self.assertEqual(current["version"], 2)
+        response.refresh_from_db()
+        self.assertTrue(response.is_checked)
+
+
+class ChangeFeedTests(ClearanceTestCase):
+    def settle(self):
+        # Entries are withheld for ChangeFeedViewSet.settle_seconds after they are written.
+        ChangeLogEntry.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+
+    def changes(self, since=None):
+        response = self.client.get("/changes/", {} if since is None else {"since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_an_update_comes_back_as_an_upsert_once_settled(self):
+        response = self.responses(self.it).first()
+        self.as_department(self.it)
+        self.settle()
+        cursor = self.changes()["cursor"]
+        self.assertEqual(self.changes(cursor), {"cursor": cursor, "has_more": False, "changes": []})
+
+        self.client.patch(f"/responses/{response.pk}/", {"is_checked": True}, format="json")
+        self.assertEqual(self.changes(cursor)["changes"], [])
+
+        self.settle()
+        delta = self.changes(cursor)
+        self.assertGreater(delta["cursor"], cursor)
+        (change,) = [change for change in delta["changes"] if change["model"] == "responses"]
+        self.assertEqual((change["id"], change["action"]), (response.pk, "upsert"))
+        self.assertIs(change["data"]["is_checked"], True)
+        self.assertEqual(self.changes(delta["cursor"])["changes"], [])
+
+        # Other departments don't see it.
+        self.as_department(self.finance)
+        self.assertFalse([change for change in self.changes(cursor)["changes"] if change["model"] == "responses"])
+
+    def test_a_deleted_row_comes_back_as_a_tombstone(self):
+        question = Question.objects.get(department=self.finance, text="Return equipment")
+        response_id = self.responses(self.finance).get(question=question).pk
+        self.as_department(self.finance)
+        self.settle()
+        cursor = self.changes()["cursor"]
+
+        self.as_hr()
+        self.assertEqual(self.client.delete(f"/questions/{question.pk}/").status_code, 204)
+        self.settle()
+        self.as_department(self.finance)
+        changes = {(change["model"], change["id"]): change for change in self.changes(cursor)["changes"]}
+        self.assertEqual(changes[("responses", response_id)], {"model": "responses", "id": response_id, "action": "delete", "data": None})
+        self.assertEqual(changes[("questions", question.pk)]["action"], "delete")
+
+    def test_a_cursor_older_than_the_horizon_is_gone(self):
+        self.as_hr()
+        self.settle()
+        cursor = self.changes()["cursor"]
+        ChangeLogHorizon.objects.create(pk=1, pruned_through=cursor)
+        response = self.client.get("/changes/", {"since": cursor - 1})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()["cursor"], cursor)
+        self.assertEqual(self.changes(cursor)["changes"], [])
+
+
+class BatchTests(ClearanceTestCase):
+    def batch(self, requests, atomic=False):
+        response = self.client.post("/batch/", {"atomic": atomic, "requests": requests}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_a_failing_sub_request_does_not_undo_the_others(self):
+        first, second = self.responses(self.it)
+        self.as_department(self.it)
+        with self.assertLogs("app1.views", "ERROR"):
+            result = self.batch([
+                {"method": "PATCH", "path": f"/responses/{first.pk}/", "body": {"is_checked": True}},
+                {"method": "GET", "path": f"/questions/for_employee/?department=999999&employee={self.employee.pk}"},
+                {"method": "GET", "path": "/admin/"},
+                {"method": "PATCH", "path": f"/responses/{second.pk}/", "body": {"is_checked": True}},
+            ])
+        self.assertFalse(result["rolled_back"])
+        self.assertEqual([item["status"] for item in result["results"]], [200, 500, 404, 200])
+        self.assertEqual(list(self.responses(self.it).values_list("is_checked", flat=True)), [True, True])
+
+    def test_atomic_batch_rolls_back_on_the_first_failure(self):
+        response = self.responses(self.it).first()
+        self.as_department(self.it)
+        result = self.batch([
+            {"method": "PATCH", "path": f"/responses/{response.pk}/", "body": {"is_checked": True}},
+            {"method": "PATCH", "path": "/responses/999999/", "body": {"is_checked": True}},
+            {"method": "PATCH", "path": f"/responses/{response.pk}/", "body": {"is_checked": False}},
+        ], atomic=True)
+        self.assertTrue(result["rolled_back"])
+        self.assertEqual([item["status"] for item in result["results"]], [200, 404])
+        response.refresh_from_db()
+        self.assertFalse(response.is_checked)
+        self.assertEqual(response.version, 1)
+
+
+class PayloadCacheTests(ClearanceTestCase):
+    def checked(self, payload):
+        return [item["is_checked"] for department in payload["departments"] for item in department["questions"]]
+
+    def test_a_version_bump_invalidates_the_cached_payload(self):
+        before = payload_cache.stats()
+        url = f"/employees/{self.employee.pk}/responses/"
+        first = self.client.get(url).json()
+        self.assertEqual(self.client.get(url).json(), first)
+        stats = payload_cache.stats()
+        self.assertEqual((stats["hits"] - before["hits"], stats["misses"] - before["misses"]), (1, 1))
+
+        response = self.responses(self.it).first()
+        self.as_department(self.it)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/responses/{response.pk}/", {"is_checked": True}, format="json")
+        self.client.credentials()
+        second = self.client.get(url).json()
+        self.assertNotEqual(self.checked(second), self.checked(first))
+        self.assertEqual(self.checked(second).count(True), 1)
+        self.assertEqual(payload_cache.stats()["misses"] - before["misses"], 2)
+
+
+class AnalyticsTests(ClearanceTestCase):
+    def clear(self, department):
+        self.as_department(department)
+        for response in self.responses(department):
+            self.client.patch(f"/responses/{response.pk}/", {"is_checked": True}, format="json")
+
+    def test_percentiles_agree_with_the_mean(self):
+        self.clear(self.it)
+        self.as_hr()
+        (row,) = self.client.get("/analytics/time-to-clear/").json()
+        self.assertEqual((row["department"], row["count"]), ("IT", 1))
+        self.assertEqual(row["median_hours"], row["mean_hours"])
+        self.assertEqual(row["p90_hours"], row["mean_hours"])
+
+    def test_rebuild_keeps_unassigned_clearances_like_the_incremental_path(self):
+        self.clear(self.finance)
+        checklists.unassign([self.employee.pk], [self.finance.pk])
+        self.as_hr()
+        incremental = self.client.get("/analytics/time-to-clear/").json()
+        self.assertEqual([row["department"] for row in incremental], ["Finance"])
+
+        analytics.rebuild()
+        self.assertTrue(DepartmentClearance.objects.filter(employee=self.employee, department=self.finance).exists())
+        self.assertEqual(self.client.get("/analytics/time-to-clear/").json(), incremental)
+
+    def test_percentile_is_the_mean_of_its_bucket(self):
+        histogram = {0: (3, 3 * 360), 5: (1, 20 * 3600)}
+        self.assertAlmostEqual(analytics.percentile(histogram, 0.5), 0.1)
+        self.assertAlmostEqual(analytics.percentile(histogram, 0.9), 20)
+        self.assertIsNone(analytics.percentile({}, 0.5))
+
+
+class OutboxTests(ClearanceTestCase):
+    def notify(self):
+        notifications.notify_departments([self.it], subject="Exit clearance started", body="Please complete it.")
+        return OutboxMessage.objects.get(channel="email")
+
+    def test_pending_messages_go_out_as_one_digest(self):
+        self.notify()
+        notifications.notify_departments([self.it], subject="New checklist item", body="Added.")
+        self.assertEqual(notifications.send_pending(), (2, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["it@example.com"])
+        self.assertFalse(OutboxMessage.objects.filter(status="pending").exists())
+
+    @override_settings(OUTBOX_RETRY_BASE_SECONDS=60, OUTBOX_MAX_ATTEMPTS=3)
+    def test_smtp_failure_backs_off_then_gives_up(self):
+        message = self.notify()
+        with mock.patch("app1.notifications.get_connection", side_effect=ConnectionRefusedError("SMTP down")):
+            for attempt, delay in ((1, 60), (2, 120)):
+                before = timezone.now()
+                self.assertEqual(notifications.send_pending(), (0, 1))
+                message.refresh_from_db()
+                self.assertEqual((message.status, message.attempts), ("pending", attempt))
+                self.assertIn("SMTP down", message.last_error)
+                self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=delay))
+                self.assertLess(message.next_attempt_at, before + timedelta(seconds=delay + 30))
+                OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+
+            self.assertEqual(notifications.send_pending(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ("failed", 3))
+        self.assertEqual(notifications.send_pending(), (0, 0))
+
+    @override_settings(OUTBOX_WEBHOOK_URL="http://hooks.invalid/outbox")
+    def test_webhook_only_runs_do_not_open_smtp(self):
+        self.notify().delete()
+        with mock.patch("app1.notifications.get_connection") as get_connection, \
+                mock.patch("app1.notifications._send_webhook") as send_webhook:
+            self.assertEqual(notifications.send_pending(), (1, 0))
+        get_connection.assert_not_called()
+        send_webhook.assert_called_once()
+
+
+class ProfilingTests(ClearanceTestCase):
+    def test_query_log_leaves_out_parameter_values(self):
+        token, _ = Token.objects.get_or_create(user=self.hr)
+        log = profiling.QueryLog()
+        with connection.execute_wrapper(log):
+            Token.objects.get(key=token.key)
+        self.assertEqual(log.count, 1)
+        self.assertEqual(log.queries[0]["param_count"], 1)
+        self.assertNotIn(token.key, json.dumps(log.queries))
+
+
+class ReportTests(ClearanceTestCase):
+    def test_a_month_that_is_not_a_string_is_a_400(self):
+        self.as_hr()
+        for month in (202410, None, ["2024-10"], "2024-13"):
+            response = self.client.post("/reports/clearances/", {"month": month}, format="json")
+            self.assertEqual(response.status_code, 400, month)
+            self.assertEqual(response.json(), {"error": "month must be YYYY-MM"})
+
+
+class AssignDepartmentsTests(ClearanceTestCase):
+    def test_ids_that_are_not_integers_are_a_400(self):
+        self.as_hr()
+        for body in (
+            {"assign": [[self.it.pk]], "filter": {"ids": [self.employee.pk]}},
+            {"assign": [{"id": self.it.pk}], "filter": {"ids": [self.employee.pk]}},
+            {"unassign": self.finance.pk, "filter": {"ids": [self.employee.pk]}},
+            {"unassign": [True], "filter": {"ids": [self.employee.pk]}},
+            {"unassign": [self.finance.pk], "filter": {"ids": [[self.employee.pk]]}},
+        ):
+            response = self.client.post("/employees/assign-departments/", body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn("error", response.json())
+        self.assertEqual(self.responses(self.finance).count(), 1)
+
+    def test_unassigning_a_department_inline(self):
+        self.as_hr()
+        response = self.client.post(
+            "/employees/assign-departments/",
+            {"unassign": [self.finance.pk], "filter": {"ids": [self.employee.pk]}},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "done")
+        self.assertEqual(list(self.employee.assigned_departments.all()), [self.it])
+
+    def test_a_failing_inline_job_leaves_nothing_behind(self):
+        legal = Department.objects.create(name="Legal", email="legal@example.com", password="legal-password", is_assigned_department=True)
+        Question.objects.create(department=legal, text="Sign NDA")
+        logged = ChangeLogEntry.objects.count()
+        self.as_hr()
+        with mock.patch("app1.checklists.fan_out", side_effect=RuntimeError("boom")):
+            response = self.client.post(
+                "/employees/assign-departments/",
+                {"assign": [legal.pk], "filter": {"ids": [self.employee.pk]}},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "failed")
+        self.assertFalse(self.employee.assigned_departments.filter(pk=legal.pk).exists())
+        self.assertEqual(ChangeLogEntry.objects.count(), logged)
+
+
+class QuestionCascadeTests(ClearanceTestCase):
+    def status(self):
+        self.employee.refresh_from_db()
+        return self.employee.status
+
+    def test_deleting_and_reapplying_questions_recomputes_the_status(self):
+        hand_over = Question.objects.get(department=self.it, text="Hand over")
+        self.responses().exclude(question=hand_over).update(is_checked=True)
+        Employee.recompute_statuses([self.employee.pk])
+        self.assertEqual(self.status(), "inprogress")
+        self.as_hr()
+
+        # The last open item goes, so the employee is done.
+        self.assertEqual(self.client.delete(f"/questions/{hand_over.pk}/").status_code, 204)
+        self.assertEqual(self.status(), "done")
+
+        # Finance's concerned item now applies to everyone: one more open row.
+        finance_hand_over = Question.objects.get(department=self.finance, text="Hand over")
+        response = self.client.patch(f"/questions/{finance_hand_over.pk}/", {"is_concerned_question": False}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.responses(self.finance).filter(question=finance_hand_over, is_checked=False).exists())
+        self.assertEqual(self.status(), "inprogress")
+
+        # And back: the row is dropped again.
+        response = self.client.patch(f"/questions/{finance_hand_over.pk}/", {"is_concerned_question": True}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.responses(self.finance).filter(question=finance_hand_over).exists())
+        self.assertEqual(self.status(), "done")
+
+    def test_large_deletes_remove_the_rows_in_one_statement_and_leave_the_status_to_the_job(self):
+        hand_over = Question.objects.get(department=self.it, text="Hand over")
+        response_id = self.responses(self.it).get(question=hand_over).pk
+        self.responses().exclude(question=hand_over).update(is_checked=True)
+        Employee.recompute_statuses([self.employee.pk])
+        self.as_hr()
+
+        with mock.patch.object(checklists, "CASCADE_INLINE_LIMIT", 0), CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(f"/questions/{hand_over.pk}/")
+        self.assertEqual(response.status_code, 202)
+        deletes = [query["sql"] for query in queries if query["sql"].startswith('DELETE FROM "app1_employeequestionresponse"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse(self.responses().filter(question_id=hand_over.pk).exists())
+        self.assertTrue(ChangeLogEntry.objects.filter(model="responses", object_id=response_id, action="delete").exists())
+        self.assertEqual(self.status(), "inprogress")
+
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(self.status(), "done")
+
+
+class QuestionBulkTests(ClearanceTestCase):
+    def bulk(self, method, department, questions):
+        return getattr(self.client, method)(
+            "/questions/bulk/", {"department": department, "questions": questions}, format="json"
+        )
+
+    def test_post_fans_new_questions_out_to_assigned_employees(self):
+        self.as_hr()
+        response = self.bulk("post", self.finance.pk, [
+            {"text": "Clear advances"},
+            {"text": "Close cost centre", "is_concerned_question": True},
+        ])
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(([question["text"] for question in body["created"]], body["kept"], body["removed"]),
+                         (["Clear advances", "Close cost centre"], 0, 0))
+        # Ann leaves IT, so Finance's concerned question doesn't apply to her.
+        self.assertEqual(
+            list(self.responses(self.finance).values_list("question__text", flat=True)),
+            ["Return equipment", "Clear advances"],
+        )
+        self.assertTrue(OutboxMessage.objects.filter(department=self.finance, subject__startswith="2 new checklist items").exists())
+
+    def test_put_keeps_unchanged_questions_and_their_answers(self):
+        kept = self.responses(self.it).get(question__text="Return equipment")
+        kept.is_checked = True
+        kept.save()
+        self.as_department(self.it)
+        response = self.bulk("put", self.it.pk, [{"text": "Return equipment"}, {"text": "Sign NDA"}])
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(([question["text"] for question in body["created"]], body["kept"], body["removed"]),
+                         (["Sign NDA"], 1, 1))
+        self.assertEqual(
+            list(self.responses(self.it).values_list("id", "question__text", "is_checked")),
+            [(kept.pk, "Return equipment", True), (self.responses(self.it).last().pk, "Sign NDA", False)],
+        )
+        self.assertFalse(Question.objects.filter(department=self.it, text="Hand over").exists())
+
+        # The same checklist again changes nothing.
+        response = self.bulk("put", self.it.pk, [{"text": "Return equipment"}, {"text": "Sign NDA"}])
+        self.assertEqual((response.status_code, response.json()["kept"], response.json()["removed"]), (200, 2, 0))
+
+    def test_bad_requests_and_other_departments_are_refused(self):
+        self.as_hr()
+        for department, questions in (
+            (None, [{"text": "x"}]),
+            ("it", [{"text": "x"}]),
+            (999999, [{"text": "x"}]),
+            (self.it.pk, {"text": "x"}),
+            (self.it.pk, [{"is_concerned_question": True}]),
+        ):
+            self.assertEqual(self.bulk("post", department, questions).status_code, 400, (department, questions))
+
+        self.as_department(self.finance)
+        response = self.bulk("put", self.it.pk, [])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Question.objects.filter(department=self.it).count(), 2)
+
+
+class LoginThrottleTests(ClearanceTestCase):
+    def department_login(self, password):
+        return self.client.post("/departments/login/", {"email": "it@example.com", "password": password}, format="json")
+
+    @override_settings(LOGIN_THROTTLE_IDENTITY_LIMIT=3)
+    def test_failed_logins_are_turned_away_with_429(self):
+        for _ in range(3):
+            self.assertEqual(self.department_login("wrong").status_code, 400)
+        with self.assertNumQueries(0):
+            response = self.department_login("it-password")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "300")
+
+        # Another identity from the same client is still let in.
+        response = self.client.post("/hr/login/", {"username": "hr", "password": "hr-password"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(LOGIN_THROTTLE_IDENTITY_LIMIT=3)
+    def test_a_successful_login_clears_the_count(self):
+        for _ in range(2):
+            self.department_login("wrong")
+        self.assertEqual(self.department_login("it-password").status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.department_login("wrong").status_code, 400)
+        self.assertEqual(self.department_login("it-password").status_code, 200)
+
+
+class ArchiveTests(ClearanceTestCase):
+    def archive(self, *args):
+        out = io.StringIO()
+        call_command("archive_clearances", "--before", "2026-06-01", *args, stdout=out)
+        return out.getvalue()
+
+    def finish(self):
+        self.responses().update(is_checked=True)
+        Employee.recompute_statuses([self.employee.pk])
+
+    def test_only_done_employees_are_archived(self):
+        self.assertIn("Archived 0 employees", self.archive())
+        self.finish()
+        self.assertIn("1 employees would be archived", self.archive("--dry-run"))
+        self.assertTrue(Employee.objects.filter(pk=self.employee.pk).exists())
+
+    def test_archived_employees_leave_the_live_tables_and_read_back_unchanged(self):
+        self.finish()
+        pk = self.employee.pk
+        row = self.client.get(f"/employees/{pk}/").json()
+        clearance = self.client.get(f"/employees/{pk}/responses/").json()
+
+        self.assertIn("Archived 1 employees", self.archive())
+        self.assertFalse(Employee.objects.filter(pk=pk).exists())
+        self.assertFalse(EmployeeQuestionResponse.objects.filter(employee_id=pk).exists())
+        self.assertFalse(DepartmentEmployeeComment.objects.filter(employee_id=pk).exists())
+        archived = ArchivedEmployee.objects.get(employee_pk=pk)
+        self.assertEqual(sorted(archived.assigned_departments.values_list("id", flat=True)), sorted([self.it.pk, self.finance.pk]))
+
+        self.assertEqual(self.client.get("/employees/").json(), [])
+        self.assertEqual(self.client.get(f"/employees/{pk}/").status_code, 404)
+        self.assertEqual(self.client.get(f"/employees/{pk}/responses/").status_code, 404)
+
+        self.assertEqual(self.client.get("/employees/", {"include_archived": 1}).json(), [{**row, "archived": True}])
+        self.assertEqual(self.client.get(f"/employees/{pk}/", {"include_archived": "true"}).json(), {**row, "archived": True})
+        self.assertEqual(self.client.get(f"/employees/{pk}/responses/", {"include_archived": 1}).json(), clearance)
+        self.assertEqual(
+            self.client.get("/employees/", {"include_archived": 1, "department": self.finance.pk}).json()[0]["id"], pk
+        )
+
+
+class EmployeeSearchTests(ClearanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Employee.objects.create(
+            employee_name="Bob", employee_id="E2", employee_department="Finance", designation="Accountant",
+            last_work_date=date(2026, 3, 31), type_of_separation="retirement",
+        )
+        # Documents are written once the transaction commits, which a test never does.
+        search.rebuild()
+
+    def search(self, **params):
+        return self.client.get("/employees/search/", params)
+
+    def test_matches_names_and_comment_text_by_prefix(self):
+        self.as_hr()
+        response = self.search(q="acc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["employee_id"] for row in response.json()], ["E2"])
+
+        comment = self.employee.department_comments.get(department=self.it)
+        comment.comment_text = "Laptop returned"
+        comment.department_head_id = "H42"
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.save()
+        self.assertEqual([row["employee_id"] for row in self.search(q="laptop").json()], ["E1"])
+        self.assertEqual([row["employee_id"] for row in self.search(q="h42").json()], ["E1"])
+        self.assertEqual(self.search(q="nobody").json(), [])
+
+    def test_filters_and_limit(self):
+        self.as_hr()
+        self.assertEqual(len(self.search(q="e").json()), 2)
+        self.assertEqual([row["employee_id"] for row in self.search(q="e", last_work_date_from="2026-02-01").json()], ["E2"])
+        self.assertEqual([row["employee_id"] for row in self.search(q="e", type_of_separation="resignation").json()], ["E1"])
+        self.assertEqual(self.search(q="e", status="done").json(), [])
+        self.assertEqual(len(self.search(q="e", limit=1).json()), 1)
+        self.assertEqual(len(self.search(q="e", limit=-1).json()), 1)
+
+    def test_bad_parameters_are_a_400(self):
+        self.as_hr()
+        for params in (
+            {},
+            {"q": "ann", "last_work_date_from": "garbage"},
+            {"q": "ann", "last_work_date_to": "2026-02-30"},
+            {"q": "ann", "limit": "many"},
+            {"q": "ann", "department": "it"},
+        ):
+            response = self.search(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn("error", response.json())
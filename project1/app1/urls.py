@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import HRRegisterViewSet, DepartmentViewSet,EmployeeViewSet,QuestionViewSet, EmployeeQuestionResponseViewSet,DepartmentEmployeeCommentViewSet
+from .views import HRRegisterViewSet, DepartmentViewSet,EmployeeViewSet,QuestionViewSet, EmployeeQuestionResponseViewSet,DepartmentEmployeeCommentViewSet, ChangeFeedViewSet, BatchView, ProfileViewSet, ReadyView, AnalyticsViewSet, JobViewSet, ReportViewSet
 
 router = DefaultRouter()
 router.register("hr", HRRegisterViewSet, basename="hr")
@@ -9,9 +9,16 @@ router.register("employees", EmployeeViewSet, basename="employees")
 router.register(r"questions", QuestionViewSet, basename="question")
 router.register(r"responses", EmployeeQuestionResponseViewSet, basename="response")
 router.register(r"department-comments", DepartmentEmployeeCommentViewSet, basename="department-comment")
+router.register(r"changes", ChangeFeedViewSet, basename="changes")
+router.register(r"profiles", ProfileViewSet, basename="profiles")
+router.register(r"analytics", AnalyticsViewSet, basename="analytics")
+router.register(r"jobs", JobViewSet, basename="jobs")
+router.register(r"reports", ReportViewSet, basename="reports")
 
 
 urlpatterns = [
+    path("batch/", BatchView.as_view(), name="batch"),
+    path("ready/", ReadyView.as_view(), name="ready"),
     path("", include(router.urls)),
 ]
 
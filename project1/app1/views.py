@@ -1,15 +1,39 @@
-from rest_framework.viewsets import ModelViewSet
+import io
+import json
+import logging
+import os
+from urllib.parse import urlsplit
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet, ViewSet
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.authtoken.models import Token
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from django.conf import settings
 from django.contrib.auth import authenticate
-from .models import Department,Employee,Question, EmployeeQuestionResponse, DepartmentEmployeeComment
-from .serializers import HRRegisterSerializer, DepartmentSerializer,EmployeeSerializer,QuestionSerializer, EmployeeQuestionResponseSerializer, DepartmentEmployeeCommentSerializer,EmployeeCreateSerializer
+from django.db import transaction
+from django.db.models import Q
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import resolve, Resolver404
+from django.utils import timezone
+from datetime import datetime, timedelta
+from .models import Department,Employee,Question, EmployeeQuestionResponse, DepartmentEmployeeComment, ChangeLogEntry, ChangeLogHorizon, ArchivedEmployee, ClearanceRollup, Job
+from .serializers import HRRegisterSerializer, DepartmentSerializer,EmployeeSerializer,QuestionSerializer, EmployeeQuestionResponseSerializer, DepartmentEmployeeCommentSerializer,EmployeeCreateSerializer, JobSerializer
 from django.contrib.auth.models import User
 from rest_framework import status
 from rest_framework import serializers # Import serializers for ValidationError
+from . import analytics, checklists, jobs, login_throttle, reports, rows, payload_cache, archive, search, changefeed, deferred, notifications, concurrency, profiling, warmup
+from django.http import Http404, FileResponse
+from django.utils.crypto import constant_time_compare
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+logger = logging.getLogger(__name__)
+
+
+def _is_id_list(value):
+    # bool is an int subclass, but true/false are never ids.
+    return isinstance(value, list) and all(isinstance(item, int) and not isinstance(item, bool) for item in value)
 
 
 class HRRegisterViewSet(ModelViewSet):
@@ -22,10 +46,16 @@ class HRRegisterViewSet(ModelViewSet):
     def login(self, request):
         username = request.data.get("username")
         password = request.data.get("password")
+        # Turned away before authenticate() spends a password hash on it.
+        if login_throttle.blocked("hr", username, request):
+            body, code, headers = login_throttle.rejection()
+            return Response(body, status=code, headers=headers)
         user = authenticate(username=username, password=password)
         if user and hasattr(user, "hr_profile"):
+            login_throttle.succeeded("hr", username, request)
             token, _ = Token.objects.get_or_create(user=user)
             return Response({"token": token.key, "role": "HR"})
+        login_throttle.failed("hr", username, request)
         return Response({"error": "Invalid credentials"}, status=400)
 
 
@@ -57,23 +87,32 @@ class DepartmentViewSet(ModelViewSet):
     def login(self, request):
         email = request.data.get("email")
         password = request.data.get("password")
-        try:
-            dept = Department.objects.get(email=email, password=password)
-            user, created = User.objects.get_or_create(username=f"dept_{dept.id}")
-            token, _ = Token.objects.get_or_create(user=user)
-            return Response({
+        if login_throttle.blocked("department", email, request):
+            body, code, headers = login_throttle.rejection()
+            return Response(body, status=code, headers=headers)
+        # One lookup on the unique email brings the department's user and token.
+        dept = Department.objects.select_related("user__auth_token").filter(email=email).first()
+        if dept is None or not dept.password or not constant_time_compare(dept.password, str(password or "")):
+            login_throttle.failed("department", email, request)
+            return Response({"error": "Invalid credentials"}, status=400)
+        login_throttle.succeeded("department", email, request)
+        token = getattr(dept.user, "auth_token", None)
+        if token is None:
+            # Provisioned with the department; only missing if it was removed since.
+            dept.provision_user()
+            token = Token.objects.get(user_id=dept.user_id)
+        return Response({
             "token": token.key,
             "role": "Department",
             "department": dept.name,
             "department_id": dept.id
         })
-        except Department.DoesNotExist:
-            return Response({"error": "Invalid credentials"}, status=400)
 
 
-class EmployeeViewSet(ModelViewSet):
+class EmployeeViewSet(concurrency.VersionedModelMixin, rows.RowListMixin, ModelViewSet):
     queryset = Employee.objects.all().order_by("-created_at")
     serializer_class = EmployeeSerializer
+    row_builder = staticmethod(rows.employee_rows)
     authentication_classes = [TokenAuthentication]
 
     def get_permissions(self):
@@ -87,6 +126,37 @@ class EmployeeViewSet(ModelViewSet):
         if dept_id:
             queryset = queryset.filter(assigned_departments__id=dept_id)
         return queryset
+
+    # Archived clearances are only read when the client asks for them
+    def include_archived(self):
+        return self.request.query_params.get("include_archived", "").lower() in ("1", "true", "yes")
+
+    def get_archived_queryset(self):
+        queryset = ArchivedEmployee.objects.all()
+        dept_id = self.request.query_params.get("department")
+        if dept_id:
+            queryset = queryset.filter(assigned_departments__id=dept_id)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self.include_archived():
+            response.data = list(response.data) + archive.archived_rows(self.get_archived_queryset())
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = self.get_archived_employee()
+            if archived is None:
+                raise
+            return Response({**archived.snapshot["employee"], "archived": True})
+
+    def get_archived_employee(self):
+        if not self.include_archived():
+            return None
+        return ArchivedEmployee.objects.filter(employee_pk=self.kwargs["pk"]).first()
     
     def perform_create(self, serializer):
         employee = serializer.save()
@@ -115,12 +185,39 @@ class EmployeeViewSet(ModelViewSet):
             )
         employee.update_status()
 
+        notifications.notify_departments(
+            employee.assigned_departments.all(),
+            subject=f"Exit clearance started: {employee.employee_name} ({employee.employee_id})",
+            body=(
+                f"{employee.employee_name}, {employee.designation}"
+                f"{f' ({employee.employee_department})' if employee.employee_department else ''}, "
+                f"last working day {employee.last_work_date}. Please complete your department's checklist."
+            ),
+            payload={"event": "employee_created", "employee": employee.id},
+        )
+
+    def perform_update(self, serializer):
+        self.claim_version(serializer.instance)
+        before = set(serializer.instance.assigned_departments.values_list("id", flat=True))
+        employee = serializer.save()
+        if "assigned_departments" in serializer.validated_data:
+            for dept in employee.assigned_departments.exclude(id__in=before):
+                checklists.provision(dept, [employee.id])
+        if "status" not in serializer.validated_data:
+            # The status saved with the rest of the row was read before this
+            # request; re-derive it in case responses changed meanwhile.
+            employee.update_status()
+
     @action(detail=False, methods=["get"])
     def summary(self, request):
         total = Employee.objects.count()
         pending = Employee.objects.filter(status="pending").count()
         inprogress = Employee.objects.filter(status="inprogress").count()
         done = Employee.objects.filter(status="done").count()
+        if self.include_archived():
+            archived = ArchivedEmployee.objects.count()
+            total += archived
+            done += archived
         return Response({
             "total": total,
             "pending": pending,
@@ -130,7 +227,20 @@ class EmployeeViewSet(ModelViewSet):
     
     @action(detail=True, methods=["get"])
     def responses(self, request, pk=None):
-       employee = self.get_object()
+        try:
+            employee = self.get_object()
+        except Http404:
+            archived = self.get_archived_employee()
+            if archived is None:
+                raise
+            return Response(archived.snapshot["clearance"])
+        department_ids = employee.assigned_departments.values_list("id", flat=True)
+        key = payload_cache.responses_key(employee, department_ids)
+        payload = payload_cache.get_or_build(key, lambda: self.build_responses_payload(employee), done=employee.status == "done")
+        return Response(payload)
+
+    @staticmethod
+    def build_responses_payload(employee):
        data = []
        all_done = True
        any_done = False
@@ -197,12 +307,95 @@ class EmployeeViewSet(ModelViewSet):
        else:
         overall_status = "pending"
 
-       return Response({
+       return {
         "employee": employee.employee_name,
         "overall_status": overall_status,
         "employee_department": employee.employee_department,
         "departments": data,
-    })
+    }
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"error": "q is required"}, status=400)
+
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 50)), 500))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+
+        filters = {
+            "status": "status",
+            "type_of_separation": "type_of_separation",
+            "last_work_date_from": "last_work_date__gte",
+            "last_work_date_to": "last_work_date__lte",
+        }
+        try:
+            queryset = search.search_employees(query, self.get_queryset())
+            for param, lookup in filters.items():
+                value = request.query_params.get(param)
+                if value:
+                    queryset = queryset.filter(**{lookup: value})
+            return Response(rows.employee_rows(queryset[:limit]))
+        except (ValueError, TypeError, DjangoValidationError):
+            return Response({"error": "invalid filter"}, status=400)
+
+    @action(detail=False, methods=["post"], url_path="assign-departments")
+    def assign_departments(self, request):
+        """
+        Assign and/or unassign departments for a filtered set of employees.
+        Body: ``{"assign": [ids], "unassign": [ids], "filter": {...}}`` where the
+        filter takes ``ids``, ``status``, ``type_of_separation`` (value or list)
+        and ``last_work_date_from`` / ``last_work_date_to``. Small selections run
+        inline; larger ones return 202 and a job to poll at /jobs/<id>/.
+        """
+        if not hasattr(request.user, "hr_profile"):
+            return Response({"error": "Only HR can assign departments in bulk"}, status=403)
+
+        assign = request.data.get("assign") or []
+        unassign = request.data.get("unassign") or []
+        filters = request.data.get("filter")
+        if not (assign or unassign) or not isinstance(filters, dict) or not filters:
+            return Response({"error": "assign or unassign, and a non-empty filter, are required"}, status=400)
+        if not (_is_id_list(assign) and _is_id_list(unassign) and _is_id_list(filters.get("ids", []))):
+            return Response({"error": "assign, unassign and filter.ids must be lists of integer ids"}, status=400)
+        if set(assign) & set(unassign):
+            return Response({"error": "a department can't be both assigned and unassigned"}, status=400)
+        known = Department.objects.filter(id__in=[*assign, *unassign])
+        if known.count() != len({*assign, *unassign}):
+            return Response({"error": "unknown department"}, status=400)
+        if known.filter(id__in=assign, is_assigned_department=False).exists():
+            return Response({"error": "only assignable departments can be assigned"}, status=400)
+
+        employees = Employee.objects.all()
+        try:
+            for field in ("status", "type_of_separation"):
+                if field in filters:
+                    values = filters[field] if isinstance(filters[field], list) else [filters[field]]
+                    employees = employees.filter(**{f"{field}__in": values})
+            if "ids" in filters:
+                employees = employees.filter(id__in=filters["ids"])
+            if filters.get("last_work_date_from"):
+                employees = employees.filter(last_work_date__gte=filters["last_work_date_from"])
+            if filters.get("last_work_date_to"):
+                employees = employees.filter(last_work_date__lte=filters["last_work_date_to"])
+            employee_ids = list(employees.order_by("id").values_list("id", flat=True))
+        except (ValueError, TypeError, DjangoValidationError):
+            return Response({"error": "invalid filter"}, status=400)
+
+        params = {"employee_ids": employee_ids, "assign": assign, "unassign": unassign}
+        if len(employee_ids) <= checklists.ASSIGN_CHUNK_SIZE:
+            job = jobs.run_now("assign_departments", params, total=len(employee_ids), user=request.user)
+            return Response(JobSerializer(job).data)
+        job = jobs.enqueue("assign_departments", params, total=len(employee_ids), user=request.user)
+        return Response(JobSerializer(job).data, status=202)
+
+    @action(detail=False, methods=["get"])
+    def cache_stats(self, request):
+        if not hasattr(request.user, "hr_profile"):
+            return Response({"error": "Only HR can view cache statistics"}, status=403)
+        return Response(payload_cache.stats())
 
     @action(detail=False, methods=["get"])
     def department_summary(self, request):
@@ -238,32 +431,114 @@ class EmployeeViewSet(ModelViewSet):
             return EmployeeCreateSerializer # We'll define this new serializer below
         return self.serializer_class
 
-class QuestionViewSet(ModelViewSet):
+class QuestionViewSet(rows.RowListMixin, ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
+    row_builder = staticmethod(rows.question_rows)
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
         question = serializer.save()
-        # Find all employees currently assigned to this department
-        employees_assigned_to_this_dept = Employee.objects.filter(assigned_departments=question.department)
+        # Add the question (and the department's comment row where missing) to
+        # every assigned employee it applies to, then recompute their statuses.
+        checklists.fan_out(question.department, [question])
+
+        notifications.notify_departments(
+            [question.department],
+            subject=f"New checklist item for {question.department.name}",
+            body=f"\"{question.text}\" was added to your exit checklist.",
+            payload={"event": "question_created", "question": question.id},
+        )
 
-        for emp in employees_assigned_to_this_dept:
-            # Only create a response if it's a regular question OR
-            # if it's a concerned question AND the employee's department matches
-            if not question.is_concerned_question or (question.is_concerned_question and emp.employee_department == question.department.name):
-                EmployeeQuestionResponse.objects.get_or_create(
-                    employee=emp, department=question.department, question=question
-                )
-                # Ensure comment entry exists for this new department-employee pairing
-                DepartmentEmployeeComment.objects.get_or_create(
-                    employee=emp, department=question.department, defaults={'comment_text': '', 'department_head_id': ''}
+    def update(self, request, *args, **kwargs):
+        self.cascade_job = None
+        response = super().update(request, *args, **kwargs)
+        if self.cascade_job is not None:
+            response.data = {**response.data, "job": JobSerializer(self.cascade_job).data}
+        return response
+
+    def perform_update(self, serializer):
+        department_id = serializer.instance.department_id
+        concerned = serializer.instance.is_concerned_question
+        with transaction.atomic(), deferred.collect():
+            question = serializer.save()
+            if question.department_id == department_id and question.is_concerned_question == concerned:
+                return  # the text changed; the save signals cover that
+            if question.department_id != department_id:
+                changefeed.record("questions", question.pk, "delete", department_id)
+                payload_cache.invalidate("department", [department_id])
+            # Moving rows between departments or flipping the concerned
+            # rule is finished by a job when it touches many employees.
+            employee_ids = checklists.question_cascade_scope(question, department_id)
+            if len(employee_ids) <= checklists.CASCADE_INLINE_LIMIT:
+                checklists.reapply_question(question, employee_ids)
+            else:
+                self.cascade_job = jobs.enqueue(
+                    "question_cascade",
+                    {"question": question.pk, "employee_ids": employee_ids},
+                    total=len(employee_ids),
+                    user=self.request.user,
                 )
-        # Update status for all affected employees
-        for emp in employees_assigned_to_this_dept:
-            emp.update_status()
 
+    def destroy(self, request, *args, **kwargs):
+        question = self.get_object()
+        with transaction.atomic(), deferred.collect():
+            affected = checklists.delete_question(question)
+            if len(affected) <= checklists.CASCADE_INLINE_LIMIT:
+                # Employees whose last open item this was are now done.
+                checklists.recompute(affected)
+                return Response(status=204)
+            job = jobs.enqueue(
+                "question_cascade",
+                {"employee_ids": sorted(affected)},
+                total=len(affected),
+                user=request.user,
+            )
+        return Response({"job": JobSerializer(job).data}, status=202)
+
+    @action(detail=False, methods=["post", "put"])
+    def bulk(self, request):
+        """
+        ``POST`` adds questions to a department's checklist, ``PUT`` replaces
+        the whole checklist, keeping questions that are unchanged. Body:
+        ``{"department": <id>, "questions": [{"text": ..., "is_concerned_question": ...}]}``.
+        """
+        try:
+            department = Department.objects.get(id=request.data.get("department"))
+        except (Department.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "department required"}, status=400)
+        if not hasattr(request.user, "hr_profile") and request.user.username != f"dept_{department.id}":
+            return Response({"error": "Only HR or the department itself can edit its checklist"}, status=403)
+
+        items = request.data.get("questions")
+        if not isinstance(items, list):
+            return Response({"error": "questions must be a list"}, status=400)
+        serializer = QuestionSerializer(
+            data=[{**item, "department": department.id} if isinstance(item, dict) else item for item in items], many=True
+        )
+        serializer.is_valid(raise_exception=True)
+        fields = [
+            {"text": item["text"], "is_concerned_question": item.get("is_concerned_question", False)}
+            for item in serializer.validated_data
+        ]
+
+        with transaction.atomic(), deferred.collect():
+            if request.method == "PUT":
+                kept, created, removed = checklists.replace_questions(department, fields)
+            else:
+                kept, (created, _), removed = [], checklists.create_questions(department, fields), 0
+            if created:
+                notifications.notify_departments(
+                    [department],
+                    subject=f"{len(created)} new checklist items for {department.name}",
+                    body="\n".join(f"- {question.text}" for question in created),
+                    payload={"event": "questions_created", "questions": [question.id for question in created]},
+                )
+        return Response(
+            {"created": QuestionSerializer(created, many=True).data, "kept": len(kept), "removed": removed},
+            status=201 if created else 200,
+        )
 
     @action(detail=False, methods=["get"])
     def for_employee(self, request):
@@ -275,6 +550,13 @@ class QuestionViewSet(ModelViewSet):
         employee = Employee.objects.get(id=emp_id)
         department = Department.objects.get(id=dept_id)
 
+        key = payload_cache.for_employee_key(employee, department)
+        payload = payload_cache.get_or_build(
+            key, lambda: self._build_for_employee(employee, department), done=employee.status == "done"
+        )
+        return Response(payload)
+
+    def _build_for_employee(self, employee, department):
         # Filter questions based on the new logic
         questions_to_display = Question.objects.none()
         questions_to_display |= department.questions.filter(is_concerned_question=False) # Always add regular questions
@@ -305,12 +587,13 @@ class QuestionViewSet(ModelViewSet):
             "comment_id": dept_comment_obj.id if dept_comment_obj else None,
         }
 
-        return Response({"questions": results, "department_comment_data": comment_data})
+        return {"questions": results, "department_comment_data": comment_data}
 
 
-class EmployeeQuestionResponseViewSet(ModelViewSet):
+class EmployeeQuestionResponseViewSet(concurrency.VersionedModelMixin, rows.RowListMixin, ModelViewSet):
     queryset = EmployeeQuestionResponse.objects.all()
     serializer_class = EmployeeQuestionResponseSerializer
+    row_builder = staticmethod(rows.response_rows)
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -325,13 +608,15 @@ class EmployeeQuestionResponseViewSet(ModelViewSet):
         return qs
     
     def perform_update(self, serializer):
+        self.claim_version(serializer.instance)
         instance = serializer.save()
         instance.employee.update_status()
 
 
-class DepartmentEmployeeCommentViewSet(ModelViewSet):
+class DepartmentEmployeeCommentViewSet(concurrency.VersionedModelMixin, rows.RowListMixin, ModelViewSet):
     queryset = DepartmentEmployeeComment.objects.all()
     serializer_class = DepartmentEmployeeCommentSerializer
+    row_builder = staticmethod(rows.comment_rows)
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -378,6 +663,9 @@ class DepartmentEmployeeCommentViewSet(ModelViewSet):
             defaults={'comment_text': comment_text, 'department_head_id': department_head_id} # NEW: Set department_head_id
         )
         if not created:
+            # Another save since the client loaded the comment is a conflict,
+            # not something to overwrite.
+            self.claim_version(comment_instance)
             comment_instance.comment_text = comment_text
             comment_instance.department_head_id = department_head_id # NEW: Update department_head_id
             comment_instance.save()
@@ -394,30 +682,326 @@ class DepartmentEmployeeCommentViewSet(ModelViewSet):
         if logged_in_dept_id != comment_instance.department.id:
             raise serializers.ValidationError({"detail": "You can only update comments for your own department."})
 
+        self.claim_version(serializer.instance)
         # Allow updating department_head_id here as well
         serializer.save(department_head_id=self.request.data.get('department_head_id', comment_instance.department_head_id))
 
 
+class ChangeFeedViewSet(ViewSet):
+    """
+    Delta sync: ``GET /changes?since=<cursor>`` returns the rows changed after
+    the cursor, deduplicated to their latest state, plus the next cursor.
+    Without ``since`` only the current cursor is returned, so a client can
+    take it before doing its initial full download.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    default_limit = 500
+    max_limit = 1000
+    # Entries are only handed out once they are this old, so a transaction
+    # that committed after a later id can't be skipped by a client's cursor.
+    settle_seconds = 2
+    row_builders = {
+        "employees": (Employee, rows.employee_rows),
+        "questions": (Question, rows.question_rows),
+        "responses": (EmployeeQuestionResponse, rows.response_rows),
+        "department-comments": (DepartmentEmployeeComment, rows.comment_rows),
+    }
+
+    def list(self, request):
+        entries = ChangeLogEntry.objects.all()
+        if hasattr(request.user, "hr_profile"):
+            # Department-scoped employee entries are only for that department.
+            entries = entries.exclude(model="employees", department_id__isnull=False)
+        elif request.user.username.startswith("dept_"):
+            dept_id = int(request.user.username.split("_")[1])
+            assigned = Employee.assigned_departments.through.objects.filter(department_id=dept_id).values("employee_id")
+            entries = entries.filter(
+                Q(department_id=dept_id)
+                | Q(model="employees", department_id__isnull=True, object_id__in=assigned)
+            )
+        else:
+            return Response({"error": "Only HR and department users can sync changes"}, status=403)
 
+        cutoff = timezone.now() - timedelta(seconds=self.settle_seconds)
+        ceiling = (
+            ChangeLogEntry.objects.filter(created_at__lte=cutoff)
+            .order_by("-id").values_list("id", flat=True).first()
+        ) or 0
 
+        since = request.query_params.get("since")
+        if since is None:
+            return Response({"cursor": ceiling, "has_more": False, "changes": []})
+        try:
+            since = int(since)
+            limit = min(int(request.query_params.get("limit", self.default_limit)), self.max_limit)
+        except ValueError:
+            return Response({"error": "since and limit must be integers"}, status=400)
+
+        horizon = ChangeLogHorizon.objects.filter(pk=1).values_list("pruned_through", flat=True).first() or 0
+        if since < horizon:
+            return Response(
+                {"error": "Cursor has expired, download the full lists again", "cursor": ceiling},
+                status=status.HTTP_410_GONE,
+            )
+
+        page = list(
+            entries.filter(id__gt=since, id__lte=ceiling)
+            .order_by("id")
+            .values_list("id", "model", "object_id", "action")[:limit + 1]
+        )
+        has_more = len(page) > limit
+        page = page[:limit]
+        cursor = page[-1][0] if has_more else max(since, ceiling)
+
+        # Latest action per row wins; upserts are answered with current data.
+        latest = {}
+        for _, model, object_id, action in page:
+            latest.pop((model, object_id), None)
+            latest[(model, object_id)] = action
+
+        upserts = {}
+        for (model, object_id), action in latest.items():
+            if action == "upsert":
+                upserts.setdefault(model, []).append(object_id)
+        data = {}
+        for model, ids in upserts.items():
+            model_class, builder = self.row_builders[model]
+            for row in builder(model_class.objects.filter(pk__in=ids)):
+                data[(model, row["id"])] = row
+
+        changes = []
+        for (model, object_id), action in latest.items():
+            row = data.get((model, object_id))
+            changes.append({
+                "model": model,
+                "id": object_id,
+                "action": "upsert" if row is not None else "delete",
+                "data": row,
+            })
+        return Response({"cursor": cursor, "has_more": has_more, "changes": changes})
+
+
+class BatchAborted(Exception):
+    pass
 
 
+class BatchView(APIView):
+    """
+    Run an ordered list of sub-requests against the API routes in-process::
 
+        POST /batch/
+        {"atomic": false, "requests": [
+            {"method": "GET", "path": "/employees/5/"},
+            {"method": "PATCH", "path": "/responses/12/", "body": {"is_checked": true}}
+        ]}
 
+    Sub-requests share the caller's authentication and one transaction; each
+    runs in its own savepoint, so a failed one (status >= 400, including an
+    unhandled error, reported as 500) is undone without affecting the rest.
+    With ``"atomic": true`` the first failure rolls the whole batch back. Status recomputation and cache invalidation
+    run once, after the last sub-request.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    max_requests = 50
+    forwarded_headers = ("HTTP_HOST", "SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR", "wsgi.url_scheme", "HTTP_X_FORWARDED_PROTO")
+
+    def post(self, request):
+        subrequests = request.data.get("requests")
+        if not isinstance(subrequests, list) or not subrequests:
+            return Response({"error": "requests must be a non-empty list"}, status=400)
+        if len(subrequests) > self.max_requests:
+            return Response({"error": f"At most {self.max_requests} requests per batch"}, status=400)
+        atomic = bool(request.data.get("atomic", False))
+
+        results = []
+        snapshot = changefeed.mark()
+        try:
+            with transaction.atomic(), deferred.collect():
+                for subrequest in subrequests:
+                    sub_snapshot = changefeed.mark()
+                    with transaction.atomic():
+                        result = self.perform(request, subrequest)
+                        failed = result["status"] >= 400
+                        if failed and atomic:
+                            results.append(result)
+                            raise BatchAborted
+                        if failed:
+                            transaction.set_rollback(True)
+                    if failed:
+                        changefeed.restore(sub_snapshot)
+                    results.append(result)
+        except BatchAborted:
+            changefeed.restore(snapshot)
+            return Response({"rolled_back": True, "results": results})
+        return Response({"rolled_back": False, "results": results})
+
+    def perform(self, request, subrequest):
+        if not isinstance(subrequest, dict) or not isinstance(subrequest.get("path"), str):
+            return {"status": 400, "body": {"error": "Each request needs a path"}}
+        method = str(subrequest.get("method", "GET")).upper()
+        url = urlsplit(subrequest["path"])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {"status": 404, "body": {"error": "Not found"}}
+        view_class = getattr(match.func, "cls", None)
+        if view_class is None or not issubclass(view_class, APIView):
+            # Only API routes; the admin and other plain Django views aren't batchable.
+            return {"status": 404, "body": {"error": "Not found"}}
+        if view_class is type(self):
+            return {"status": 400, "body": {"error": "Batches can't be nested"}}
+
+        body = json.dumps(subrequest["body"]).encode() if "body" in subrequest else b""
+        environ = {key: request.META[key] for key in self.forwarded_headers if key in request.META}
+        environ.update({
+            "REQUEST_METHOD": method,
+            "PATH_INFO": url.path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        })
+        for name, value in (subrequest.get("headers") or {}).items():
+            environ["HTTP_" + name.upper().replace("-", "_")] = str(value)
 
+        sub_request = WSGIRequest(environ)
+        # DRF skips the authenticators when these are set: the batch was
+        # authenticated once already.
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
 
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+            if hasattr(response, "render"):
+                response.render()
+        except Exception:
+            # What the handler would have answered on its own; the caller's
+            # savepoint undoes the sub-request and the batch goes on.
+            logger.exception("Batch sub-request %s %s failed", method, url.path)
+            return {"status": 500, "body": {"error": "Internal server error"}}
+        content = response.content
+        if content and response.get("Content-Type", "").startswith("application/json"):
+            content = json.loads(content)
+        else:
+            content = content.decode(errors="replace")
+        headers = {name: response[name] for name in ("ETag", "Location") if response.has_header(name)}
+        result = {"status": response.status_code, "body": content}
+        if headers:
+            result["headers"] = headers
+        return result
 
 
+class ProfileViewSet(ViewSet):
+    """Stored request profiles (see ``profiling.py``), newest first."""
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
 
+    def list(self, request):
+        return Response(profiling.list_profiles())
 
+    def retrieve(self, request, pk=None):
+        record = profiling.load(pk)
+        if record is None:
+            raise Http404
+        return Response(record)
 
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        record = profiling.load(pk)
+        if record is None or not os.path.exists(profiling.raw_path(record)):
+            raise Http404
+        return FileResponse(open(profiling.raw_path(record), "rb"), as_attachment=True, filename=record["raw_file"])
+
+
+class ReadyView(APIView):
+    """
+    Readiness probe: 503 until this process has run the shared warm-up stages.
+    Under gunicorn those run before any worker is forked, so this is 200 from
+    every serving worker; see ``warmup.py``.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
 
+    def get(self, request):
+        state = warmup.status()
+        return Response(state, status=200 if state["ready"] else 503)
 
 
+class AnalyticsViewSet(ViewSet):
+    """HR reports, served from the precomputed rollups only (see ``analytics.py``)."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
+    @action(detail=False, methods=["get"], url_path="time-to-clear")
+    def time_to_clear(self, request):
+        """``?from=YYYY-MM&to=YYYY-MM&department=<id>&type_of_separation=<type>``, all optional."""
+        if not hasattr(request.user, "hr_profile"):
+            return Response({"error": "Only HR can view analytics"}, status=403)
 
+        rollups = ClearanceRollup.objects.all()
+        try:
+            if request.query_params.get("from"):
+                start = datetime.strptime(request.query_params["from"], "%Y-%m").date()
+                rollups = rollups.filter(day__gte=start)
+            if request.query_params.get("to"):
+                end = datetime.strptime(request.query_params["to"], "%Y-%m").date()
+                rollups = rollups.filter(day__lt=(end + timedelta(days=31)).replace(day=1))
+            if request.query_params.get("department"):
+                rollups = rollups.filter(department_id=int(request.query_params["department"]))
+        except ValueError:
+            return Response({"error": "from/to must be YYYY-MM and department an id"}, status=400)
+        if request.query_params.get("type_of_separation"):
+            rollups = rollups.filter(type_of_separation=request.query_params["type_of_separation"])
+        return Response(analytics.time_to_clear(rollups))
+
+
+class JobViewSet(ReadOnlyModelViewSet):
+    """Progress of background jobs; HR sees every job, others the ones they started."""
+    serializer_class = JobSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = Job.objects.order_by("-created_at")
+        if hasattr(self.request.user, "hr_profile"):
+            return queryset
+        return queryset.filter(created_by=self.request.user)
 
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """The file a finished job produced, e.g. a clearance report zip."""
+        job = self.get_object()
+        name = (job.result or {}).get("file")
+        path = os.path.join(settings.MEDIA_ROOT, name) if job.status == "done" and name else None
+        if path is None or not os.path.exists(path):
+            raise Http404
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=os.path.basename(path))
 
 
+class ReportViewSet(ViewSet):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
+    @action(detail=False, methods=["post"])
+    def clearances(self, request):
+        """
+        Queue the clearance certificates and summary of every exit completed
+        in ``{"month": "YYYY-MM"}``. Returns 202 and a job; the zip is at
+        /jobs/<id>/download/ once it is done.
+        """
+        if not hasattr(request.user, "hr_profile"):
+            return Response({"error": "Only HR can generate clearance reports"}, status=403)
+        try:
+            year, month = reports.parse_month(request.data.get("month"))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+        job = jobs.enqueue(
+            "clearance_reports",
+            {"year": year, "month": month},
+            total=reports.finished_in(year, month).count(),
+            user=request.user,
+        )
+        return Response(JobSerializer(job).data, status=202)
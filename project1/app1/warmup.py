@@ -0,0 +1,163 @@
+"""
+Worker warm-up.
+
+Pays the one-off costs of a fresh process before it takes traffic instead of
+on its first requests: importing the API modules, building the URL resolver,
+introspecting the serializers' model fields, priming the payload cache and
+opening the database connection.
+
+``gunicorn.conf.py`` runs the process-wide stages once in the master (they
+are inherited by every forked worker, and the payload cache is shared by
+them) and only the database stage in each worker after the fork, since a
+connection may not be shared across a fork. ``manage.py warmup`` runs all of
+them and can measure the difference.
+
+Gunicorn forks the workers after the shared stages and a worker accepts
+connections only once its own stage is done, so ``/ready/`` answers 200 from
+any worker that serves it. It reports the stages this process has run.
+"""
+import importlib
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Safe to run before forking; the result is shared by all workers.
+SHARED_STAGES = ("imports", "urls", "serializers", "renderers", "payloads")
+# Must run in each worker.
+WORKER_STAGES = ("database",)
+STAGES = SHARED_STAGES + WORKER_STAGES
+
+MODULES = (
+    "app1.views",
+    "app1.serializers",
+    "app1.rows",
+    "app1.renderers",
+    "app1.concurrency",
+    "rest_framework.authtoken.models",
+    "rest_framework.authentication",
+    "rest_framework.permissions",
+    "rest_framework.negotiation",
+    "rest_framework.parsers",
+    "rest_framework.renderers",
+    "rest_framework.pagination",
+    "rest_framework.routers",
+    "django.contrib.admin.sites",
+)
+
+_state = {"started": None, "finished": None, "timings": {}}
+
+
+def _imports():
+    for name in MODULES:
+        importlib.import_module(name)
+
+
+def _urls():
+    from django.urls import get_resolver, reverse
+
+    resolver = get_resolver()
+    resolver.url_patterns  # imports the URLconf and builds the router's patterns
+    reverse("employees-list")  # populates the reverse lookup tables
+    resolver.resolve("/employees/")
+
+
+def _serializers():
+    from rest_framework import serializers as drf_serializers
+
+    from . import serializers
+
+    for value in vars(serializers).values():
+        if (
+            isinstance(value, type)
+            and issubclass(value, drf_serializers.ModelSerializer)
+            and value.__module__ == serializers.__name__
+        ):
+            # Builds every field from the model's _meta, which also fills
+            # Django's own field caches for the model and its relations.
+            value().fields
+
+
+def _renderers():
+    from rest_framework.settings import api_settings
+
+    for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES:
+        renderer = renderer_class()
+        if renderer.format == "json":
+            renderer.render({"warm": [1, "x", None]})
+
+
+def _database():
+    for connection in connections.all():
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+
+def _payloads():
+    from . import payload_cache
+    from .models import Department, Employee
+    from .views import EmployeeViewSet
+
+    payload_cache.versions("department", Department.objects.values_list("id", flat=True))
+    employees = (
+        Employee.objects.exclude(status="done")
+        .order_by("-created_at")[:settings.WARMUP_PAYLOADS]
+    )
+    for employee in employees:
+        department_ids = employee.assigned_departments.values_list("id", flat=True)
+        payload_cache.get_or_build(
+            payload_cache.responses_key(employee, department_ids),
+            lambda: EmployeeViewSet.build_responses_payload(employee),
+            count=False,
+        )
+
+
+_RUNNERS = {
+    "imports": _imports,
+    "urls": _urls,
+    "serializers": _serializers,
+    "renderers": _renderers,
+    "payloads": _payloads,
+    "database": _database,
+}
+
+
+def run(stages=STAGES):
+    """Run ``stages`` in order and return their timings in seconds."""
+    if _state["started"] is None:
+        _state["started"] = time.time()
+    timings = {}
+    for stage in stages:
+        start = time.perf_counter()
+        try:
+            _RUNNERS[stage]()
+        except Exception:
+            # A failed stage only costs the first requests their speed.
+            logger.exception("Warm-up stage %s failed", stage)
+        timings[stage] = time.perf_counter() - start
+    for connection in connections.all():
+        if connection.settings_dict.get("OPTIONS", {}).get("pool"):
+            # Hand the connection back: the pool keeps it open for the request
+            # threads, while holding it here would take it out of their reach.
+            connection.close()
+    _state["timings"].update(timings)
+    if all(stage in _state["timings"] for stage in STAGES):
+        _state["finished"] = time.time()
+    return timings
+
+
+def status():
+    """
+    Readiness of this process: ready once the shared stages ran, or if warm-up
+    never started. ``warmed_up`` also needs the worker stages.
+    """
+    started, finished = _state["started"], _state["finished"]
+    return {
+        "ready": started is None or all(stage in _state["timings"] for stage in SHARED_STAGES),
+        "warmed_up": finished is not None,
+        "timings_ms": {stage: round(seconds * 1000, 1) for stage, seconds in _state["timings"].items()},
+    }
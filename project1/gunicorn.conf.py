@@ -0,0 +1,60 @@
+"""
+Gunicorn settings, picked up automatically from the working directory.
+
+The app is loaded once in the master and the process-wide warm-up (imports,
+URL resolver, serializer fields, the shared payload cache) runs there once,
+so every forked worker starts with it done. Each worker then only opens its
+own database connection before it accepts requests. Set WARMUP=off to skip
+both.
+
+GUNICORN_PROFILE picks the worker model:
+  sync     (default) one request per process; WEB_CONCURRENCY processes.
+  gthread  GUNICORN_THREADS threads per process, for I/O-bound traffic with
+           fewer processes and less memory.
+settings.py sizes each worker's database pool from the same variables.
+"""
+import os
+
+from project1.database import server_concurrency
+
+PROFILE = os.environ.get("GUNICORN_PROFILE", "sync")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers, threads = server_concurrency()
+worker_class = "gthread" if PROFILE == "gthread" else "sync"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+keepalive = 5  # behind Render's proxy, reuse its connections
+# Recycle workers now and then, staggered so they don't all restart at once.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"  # heartbeat file off the (possibly slow) disk
+
+WARMUP = os.environ.get("WARMUP", "on") != "off"
+
+
+def when_ready(server):
+    if not WARMUP:
+        return
+    from django.db import connections
+    from app1 import warmup
+
+    timings = warmup.run(warmup.SHARED_STAGES)
+    # Connections opened while warming up must not be inherited by workers.
+    connections.close_all()
+    server.log.info("Warm-up (shared): %s", _format(timings))
+
+
+def post_fork(server, worker):
+    if not WARMUP:
+        return
+    from app1 import warmup
+
+    timings = warmup.run(warmup.WORKER_STAGES)
+    server.log.info("Warm-up (worker %s): %s", worker.pid, _format(timings))
+
+
+def _format(timings):
+    return ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in timings.items())
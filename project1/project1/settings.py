@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 import dj_database_url # Added for PostgreSQL support
+from .database import apply_sqlite_profile, apply_postgres_profile, server_concurrency
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -56,6 +57,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app1.middleware.ProfilingMiddleware', # Opt-in, staff only: X-Profile: 1 or ?__profile=1
+    'app1.middleware.ChangeFeedMiddleware', # Batches change-log writes per request
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,10 +89,20 @@ WSGI_APPLICATION = 'project1.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:///db.sqlite3',
-        conn_max_age=600
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        conn_health_checks=True, # Drop a persistent connection that went stale instead of failing the request
     )
 }
 
+# PostgreSQL: a per-worker psycopg pool sized from WEB_CONCURRENCY / GUNICORN_THREADS,
+# or persistent health-checked connections with DB_POOL=off (see project1/database.py).
+apply_postgres_profile(DATABASES['default'], *server_concurrency())
+
+# WAL, busy timeout and BEGIN IMMEDIATE for SQLite (see project1/database.py).
+# Set SQLITE_PROFILE=off to get Django's stock SQLite behaviour.
+if os.environ.get('SQLITE_PROFILE', 'on') != 'off':
+    apply_sqlite_profile(DATABASES['default'])
+
 
 
 
@@ -109,6 +122,94 @@ else:
 
 
 
+# Caches
+# The "payloads" alias holds rendered clearance payloads (see app1/payload_cache.py).
+# It must be shared by every worker process, or an invalidation made in one worker
+# leaves the others serving stale payloads. With REDIS_URL, least recently used
+# payloads are evicted once the server is configured with maxmemory and
+# maxmemory-policy allkeys-lru. Without it the payloads go to a file cache shared
+# by the workers of one host. That cache is bounded but not LRU: when full it drops
+# a random tenth of the entries.
+
+PAYLOAD_CACHE_ALIAS = 'payloads'
+PAYLOAD_CACHE_TIMEOUT = int(os.environ.get('PAYLOAD_CACHE_TIMEOUT', 600))
+PAYLOAD_CACHE_DONE_TIMEOUT = int(os.environ.get('PAYLOAD_CACHE_DONE_TIMEOUT', 60 * 60 * 24 * 30)) # Finished checklists rarely change
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+        'payloads': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'payloads',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'payloads': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('PAYLOAD_CACHE_DIR', BASE_DIR / 'payload_cache'),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('PAYLOAD_CACHE_MAX_ENTRIES', 5000)),
+                'CULL_FREQUENCY': 10, # Drop 10% of the entries when full
+            },
+        },
+    }
+
+
+# Email and department notifications
+# Notifications are queued in the outbox and delivered by `manage.py send_outbox`.
+# The console/file backends are enough for local testing.
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails' # Used by the file backend
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'exit-clearance@localhost')
+
+OUTBOX_WEBHOOK_URL = os.environ.get('OUTBOX_WEBHOOK_URL', '') # Optional, also POST each digest as JSON
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', 60))
+
+# On-demand request profiles (see app1/profiling.py)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50)) # Oldest profiles are dropped beyond this
+
+# Worker warm-up (see app1/warmup.py and gunicorn.conf.py)
+WARMUP_PAYLOADS = int(os.environ.get('WARMUP_PAYLOADS', 200)) # Open clearances whose payloads are pre-built
+
+# Month-end clearance reports (see app1/reports.py)
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 0)) # Rendering processes; 0 uses one per CPU
+
+# Failed-login throttling for /hr/login/ and /departments/login/ (see app1/login_throttle.py)
+LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 300)) # Seconds
+LOGIN_THROTTLE_IDENTITY_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IDENTITY_LIMIT', 5)) # Failures per username/email
+LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 30)) # Failures per client IP
+LOGIN_THROTTLE_PROXY_COUNT = int(os.environ.get('LOGIN_THROTTLE_PROXY_COUNT', 1 if os.environ.get('RENDER') == 'true' else 0)) # Proxies adding X-Forwarded-For
+
+# Log unhandled request errors, with their tracebacks, to stderr in production
+# too (Django's default only mails ADMINS once DEBUG is off).
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'django.request': {'handlers': ['console'], 'level': 'ERROR', 'propagate': False},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -180,6 +281,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated', # Require authentication by default
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'app1.renderers.FastJSONRenderer', # orjson when installed, same bytes as JSONRenderer
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 